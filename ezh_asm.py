@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+
+# Assembler for the E_* macro listings that ezhdis.py writes, and a
+# round-trip check of whole images through them (bin -> .h -> bin)
+# Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import io
+import re
+import sys
+import time
+import array
+import random
+import functools
+import ezh_isa
+import ezh_compile
+import ezh_csrc
+import ezh_common
+import ezhdis
+
+LINE = re.compile(r"\s*([A-Za-z_]\w*)\s*(?:\((.*)\))?\s*$")
+DEFINE = re.compile(r"#\s*define\s+([A-Za-z_]\w*)\s+(\S+)\s*$")
+
+REGS = {name: index for (index, name) in ezh_isa.REG.items()}
+CONDS = {name: index for (index, name) in ezh_isa.COND.items()}
+
+class AsmError(ValueError):
+    pass
+
+def field_range(field):
+    # (lowest, highest) value an operand can take
+    width = ezh_isa.field_width(field)
+    if field.kind == "sint":
+        return (-(1 << (width - 1)), (1 << (width - 1)) - 1)
+    return (0, (1 << width) - 1)
+
+def build_encoders(inst, encode_bits={}):
+    # mnemonic -> (code, codemask, fields), each field (kind, parts, lowest,
+    # highest, value mask); encode_bits gives bits to set beyond the code
+    # (ezh_isa.ENCODE_BITS). Raises ezh_compile.IsaError unless every operand
+    # can be put back: its parts must not overlap each other in the word or
+    # in its value, or the code bits.
+    encoders = {}
+    for (mnemonic, codemask, code, fields) in inst:
+        if mnemonic in encoders:
+            raise ezh_compile.IsaError("Duplicate mnemonic " + mnemonic)
+        extra = encode_bits.get(mnemonic, 0)
+        if extra & codemask:
+            raise ezh_compile.IsaError("Encode bits of %s overlap its code" % mnemonic)
+        code |= extra
+        codemask |= extra
+        used = codemask
+        specs = []
+        for field in fields:
+            value_mask = 0
+            for (shift, mask) in field.parts:
+                if value_mask & mask or used & (mask << shift):
+                    raise ezh_compile.IsaError("Operand of %s can't be encoded: overlapping bits" % mnemonic)
+                value_mask |= mask
+                used |= mask << shift
+            (lowest, highest) = field_range(field)
+            specs.append((field.kind, field.parts, lowest, highest, value_mask))
+        encoders[mnemonic] = (code, codemask, specs)
+    return encoders
+
+@functools.lru_cache(maxsize=None)
+def isa_encoders(isa=ezh_isa):
+    # Encoders for the ezh_isa module or an ezh_prv.Isa, whose tables from
+    # the header already hold every bit
+    return build_encoders(isa.INST, getattr(isa, "ENCODE_BITS", {}))
+
+ENCODERS = isa_encoders()
+
+def sample(spec, rng):
+    # A random value the operand spec can encode
+    (kind, parts, lowest, highest, value_mask) = spec
+    return rng.randint(lowest, highest) & ~(~value_mask & highest)
+
+def check_encoders(isa, header, samples=64, seed=0):
+    # Lines describing where the encoders of isa give other words than those
+    # of header (an ezh_prv.Isa read from fsl_smartdma_prv.h) for the same
+    # mnemonic and operands, on random operand values of each mnemonic in both
+    mine = isa_encoders(isa)
+    theirs = isa_encoders(header)
+    rng = random.Random(seed)
+    lines = []
+    for mnemonic in sorted(set(mine) & set(theirs)):
+        specs = mine[mnemonic][2]
+        if len(specs) != len(theirs[mnemonic][2]):
+            lines.append("%s: %d operands here, %d in header" % (mnemonic, len(specs), len(theirs[mnemonic][2])))
+            continue
+        for _ in range(samples if specs else 1):
+            values = [sample(spec, rng) for spec in specs]
+            try:
+                (x, y) = (encode(mnemonic, values, mine), encode(mnemonic, values, theirs))
+            except AsmError:
+                # Out of the header's range; the disassembler never gives it
+                continue
+            if x != y:
+                lines.append("%s%s: 0x%08X here, 0x%08X in header" % (mnemonic, tuple(values), x, y))
+                break
+    return lines
+
+def encode(mnemonic, values, encoders=ENCODERS):
+    # Word for an instruction with raw operand values (see ezh_isa.raw_value);
+    # raises AsmError for an unknown mnemonic or a value out of range
+    if mnemonic not in encoders:
+        raise AsmError("Unknown mnemonic " + mnemonic)
+    (code, codemask, specs) = encoders[mnemonic]
+    if len(values) != len(specs):
+        raise AsmError("%s takes %d operands, not %d" % (mnemonic, len(specs), len(values)))
+    x = code
+    for ((kind, parts, lowest, highest, value_mask), value) in zip(specs, values):
+        if not lowest <= value <= highest or value & ~value_mask & highest:
+            raise AsmError("Operand %d of %s can't be encoded" % (value, mnemonic))
+        for (shift, mask) in parts:
+            x |= (value & mask) << shift
+    return x
+
+class Assembler:
+    # Symbols come from PERIPH_REGS and any #define NAME VALUE lines read so
+    # far, so listings written with -r assemble too
+
+    def __init__(self, isa=ezh_isa):
+        self.encoders = isa_encoders(isa)
+        self.symbols = {name: int(address) for (address, name) in ezh_isa.PERIPH_REGS.items()}
+
+    def value(self, text):
+        if text in self.symbols:
+            return self.symbols[text]
+        try:
+            return ezh_csrc.c_int(text)
+        except ValueError:
+            raise AsmError("Bad operand " + repr(text))
+
+    def operand(self, kind, text):
+        if kind == "reg":
+            table = REGS
+        elif kind == "cond":
+            table = CONDS
+        else:
+            return self.value(text)
+        if text not in table:
+            raise AsmError("Bad %s %r" % (kind, text))
+        return table[text]
+
+    def line(self, text):
+        # Returns the word for one line, a bytes tail for DCB, or None for a
+        # line with nothing to assemble
+        text = text.split("//")[0].strip()
+        if not text:
+            return None
+        if text.startswith("#"):
+            m = DEFINE.match(text)
+            if m:
+                self.symbols[m.group(1)] = self.value(m.group(2))
+            return None
+        if text.startswith("DCD "):
+            return self.value(text[4:].strip()) & 0xFFFFFFFF
+        if text.startswith("DCB "):
+            data = [self.value(byte.strip()) for byte in text[4:].split(",")]
+            if len(data) > 3 or any(not 0 <= byte <= 0xFF for byte in data):
+                raise AsmError("DCB takes up to 3 bytes")
+            return bytes(data)
+        m = LINE.match(text)
+        if not m:
+            raise AsmError("Can't parse " + repr(text))
+        (mnemonic, args) = m.groups()
+        if mnemonic not in self.encoders:
+            raise AsmError("Unknown mnemonic " + mnemonic)
+        texts = [arg.strip() for arg in args.split(",")] if args and args.strip() else []
+        specs = self.encoders[mnemonic][2]
+        if len(texts) != len(specs):
+            raise AsmError("%s takes %d operands, not %d" % (mnemonic, len(specs), len(texts)))
+        return encode(mnemonic, [self.operand(spec[0], t) for (spec, t) in zip(specs, texts)], self.encoders)
+
+    def assemble(self, lines):
+        # Returns the image for an iterable of listing lines; raises AsmError
+        # naming the line of the first error
+        words = array.array("I")
+        tail = b""
+        for (number, text) in enumerate(lines, 1):
+            try:
+                result = self.line(text)
+            except AsmError as e:
+                raise AsmError("line %d: %s" % (number, e))
+            if result == None:
+                continue
+            if tail:
+                raise AsmError("line %d: code after a partial word" % number)
+            if type(result) is bytes:
+                tail = result
+            else:
+                words.append(result)
+        if sys.byteorder != "little":
+            words.byteswap()
+        return words.tobytes() + tail
+
+def assemble(lines, isa=ezh_isa):
+    return Assembler(isa).assemble(lines)
+
+def round_trip(dis, buffer, source_name="image"):
+    # Disassembles buffer to a listing in memory and assembles it again.
+    # Returns None if that gives back the image, else the address of the
+    # first word that differs (or of its end, if only the lengths differ).
+    # Only a listing of dis with exact (ezhdis.py -e) gives back every word.
+    out = io.StringIO()
+    ezhdis.write_listing(dis, dis.disassemble(buffer), source_name, out, verbose=False)
+    image = assemble(out.getvalue().splitlines(), dis.isa)
+    original = bytes(buffer)
+    if image == original:
+        return None
+    for i in range(0, min(len(image), len(original)), 4):
+        if image[i:i + 4] != original[i:i + 4]:
+            return dis.load_addr + i
+    return dis.load_addr + min(len(image), len(original))
+
+def verify(dis, paths):
+    # Round trip for every image under paths; returns the number that fail
+    failed = 0
+    total_words = 0
+    start = time.perf_counter()
+    for bin_file in ezhdis.batch_inputs(paths):
+        try:
+            with open(bin_file, "rb") as fh:
+                buffer = ezh_common.map_image(fh)
+            addr = round_trip(dis, buffer, bin_file)
+        except (OSError, ValueError) as e:
+            failed += 1
+            print("Failed", bin_file + ":", e)
+            continue
+        total_words += len(buffer) // 4
+        if addr == None:
+            print("Round trip OK", bin_file, "(%d words)" % (len(buffer) // 4))
+        else:
+            failed += 1
+            print("Round trip differs", bin_file, "at 0x%08X" % addr)
+    elapsed = time.perf_counter() - start
+    print("%d words in %.3f s, %.0f words/sec" % (total_words, elapsed, total_words / elapsed if elapsed else 0))
+    return failed
+
+def main(argv):
+    if len(argv) < 2:
+        print("Usage:", argv[0], "[-I fsl_smartdma_prv.h] file.h")
+        print("      ", argv[0], "-v [-l load_addr] [-a num_apis] [-r] [-I fsl_smartdma_prv.h] image.bin|dir ...")
+        print("      ", argv[0], "[-I fsl_smartdma_prv.h] -c fsl_smartdma_prv.h")
+        sys.exit(1)
+    isa = ezh_isa
+    if "-I" in argv:
+        import ezh_prv
+        try:
+            isa = ezh_prv.load(argv[argv.index("-I") + 1])
+            isa_encoders(isa)
+        except (OSError, ezh_compile.IsaError) as e:
+            print(e)
+            sys.exit(1)
+    if "-c" in argv:
+        # The encoders in use against the macros of a header
+        import ezh_prv
+        path = argv[argv.index("-c") + 1]
+        try:
+            lines = check_encoders(isa, ezh_prv.load(path))
+        except (OSError, ezh_compile.IsaError) as e:
+            print(e)
+            sys.exit(1)
+        for line in lines:
+            print(line)
+        if lines:
+            sys.exit(1)
+        print("Encoders match", path)
+        return
+    if "-v" in argv:
+        load_addr = int(argv[argv.index("-l") + 1], 0) if "-l" in argv else 0x00100000
+        num_apis = int(argv[argv.index("-a") + 1]) if "-a" in argv else 0
+        dis = ezhdis.Disassembler(load_addr, num_apis, "-r" in argv, isa=isa, exact=True)
+        if verify(dis, ezhdis.positional_args(argv)):
+            sys.exit(1)
+        return
+    disas_file = argv[-1]
+    bin_file = (disas_file[:-len(".h")] if disas_file.endswith(".h") else disas_file) + ".bin"
+    try:
+        with open(disas_file, "r") as fh:
+            image = assemble(fh, isa)
+    except AsmError as e:
+        print(disas_file + ":", e)
+        sys.exit(1)
+    with open(bin_file, "wb") as fh:
+        fh.write(image)
+    print("Wrote binary", bin_file, "(%d words)" % (len(image) // 4))
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,72 @@
+# Instruction records, kinds and image helpers shared by ezhdis.py and the
+# helper modules, so that they never import the ezhdis script a second time
+# Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import os
+import sys
+import mmap
+import array
+import functools
+import collections
+import ezh_isa
+import ezh_compile
+
+WRITE_CHUNK = 4096
+
+# Instruction.kind
+API = "api"
+INST = "inst"
+UNKNOWN = "unknown"
+PARTIAL = "partial"
+DATA = "data"
+
+# operands holds the raw field values (REG/COND names, ints, ezh_isa.Addr);
+# text is the listing line without its comment. With ezhdis.py -e the listing
+# reproduces every word exactly: API entries, unknown instructions and
+# instructions with bits set that no operand covers (which their macro can't
+# encode) are DCDs of the whole word. The words ezh_flow marks as data (-d)
+# are always DCDs.
+Instruction = collections.namedtuple("Instruction", ["addr", "word", "kind", "mnemonic", "operands", "text", "comment"])
+
+@functools.lru_cache(maxsize=None)
+def compiled_isa(isa=ezh_isa):
+    # (decode, extract, raw) for the ezh_isa module or an ezh_prv.Isa, shared
+    # by all Disassemblers; raises ezh_compile.IsaError for a bad table
+    if isa is ezh_isa:
+        return ezh_compile.load_isa(ezh_isa)
+    return isa.compiled()
+
+def decoder():
+    return compiled_isa()[0]
+
+def as_words(buffer):
+    # View a bytes-like image as little-endian 32-bit words without copying;
+    # any trailing bytes that don't make up a whole word are returned separately
+    view = memoryview(buffer).cast("B")
+    whole = len(view) & ~0x3
+    words = view[:whole].cast("I")
+    if sys.byteorder != "little":
+        words = array.array("I", words)
+        words.byteswap()
+    return (words, bytes(view[whole:]))
+
+def map_image(fh):
+    if os.fstat(fh.fileno()).st_size == 0:
+        return b""
+    return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+def listing_line(inst):
+    if inst.kind == API or inst.kind == PARTIAL or inst.kind == DATA:
+        return inst.text + " // " + inst.comment + "\n"
+    return "%-48s// %s\n" % (inst.text, inst.comment)
+
+def report(inst, verbose):
+    # Returns 1 for an unknown instruction, printing it if verbose
+    if inst.kind == UNKNOWN:
+        if verbose:
+            print("Unknown instruction", "0x%08X" % inst.word, "at address", "0x%08X" % inst.addr)
+        return 1
+    if inst.kind == PARTIAL and verbose:
+        print("Partial word of", len(inst.operands), "bytes at address", "0x%08X" % inst.addr)
+    return 0
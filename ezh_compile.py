@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+# Build-time compiler for the EZH instruction table (see ezh_isa.py)
+# Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import os
+import sys
+import marshal
+import hashlib
+
+CACHE_NAME = "ezh_isa.decoder"
+
+class IsaError(Exception):
+    pass
+
+def check_disjoint(inst):
+    # Two encodings overlap if their codes agree on every bit both masks test
+    for i in range(len(inst)):
+        (mnemonic_i, codemask_i, code_i, _) = inst[i]
+        for j in range(i + 1, len(inst)):
+            (mnemonic_j, codemask_j, code_j, _) = inst[j]
+            if (code_i ^ code_j) & codemask_i & codemask_j == 0:
+                raise IsaError("Overlapping encodings: %s (0x%08X/0x%08X) and %s (0x%08X/0x%08X)" % (
+                    mnemonic_i, code_i, codemask_i, mnemonic_j, code_j, codemask_j))
+
+def pick_bit(inst, cands, tested):
+    # Most discriminating bit: the one whose larger branch holds the fewest candidates
+    best_bit = None
+    best_size = None
+    for bit in range(32):
+        if tested & (1 << bit):
+            continue
+        n0 = n1 = 0
+        for i in cands:
+            (_, codemask, code, _) = inst[i]
+            if not codemask & (1 << bit):
+                n0 += 1
+                n1 += 1
+            elif code & (1 << bit):
+                n1 += 1
+            else:
+                n0 += 1
+        if n0 == len(cands) or n1 == len(cands):
+            continue
+        if best_size == None or max(n0, n1) < best_size:
+            best_bit = bit
+            best_size = max(n0, n1)
+    return best_bit
+
+def build_tree(inst, cands=None, tested=0):
+    # Nodes are (bit, zero_subtree, one_subtree); leaves are (index, untested_mask)
+    # with index -1 for words that match nothing
+    if cands == None:
+        cands = list(range(len(inst)))
+    if len(cands) == 0:
+        return (-1, 0)
+    if len(cands) == 1:
+        return (cands[0], inst[cands[0]][1] & ~tested)
+    bit = pick_bit(inst, cands, tested)
+    if bit == None:
+        raise IsaError("Undecidable encodings: " + ", ".join(inst[i][0] for i in cands))
+    zero = [i for i in cands if not (inst[i][1] & (1 << bit)) or not (inst[i][2] & (1 << bit))]
+    one = [i for i in cands if not (inst[i][1] & (1 << bit)) or inst[i][2] & (1 << bit)]
+    tested |= 1 << bit
+    return (bit, build_tree(inst, zero, tested), build_tree(inst, one, tested))
+
+def tree_depth(tree):
+    if len(tree) == 2:
+        return 0
+    return 1 + max(tree_depth(tree[1]), tree_depth(tree[2]))
+
+def emit_tree(inst, tree, lines, indent):
+    pad = "    " * indent
+    if len(tree) == 2:
+        (index, untested) = tree
+        if index < 0:
+            lines.append(pad + "return -1")
+        elif untested == 0:
+            lines.append(pad + "return %d" % index)
+        else:
+            lines.append(pad + "return %d if (x ^ 0x%08X) & 0x%08X == 0 else -1" % (index, inst[index][2], untested))
+        return
+    (bit, zero, one) = tree
+    lines.append(pad + "if x & 0x%08X:" % (1 << bit))
+    emit_tree(inst, one, lines, indent + 1)
+    lines.append(pad + "else:")
+    emit_tree(inst, zero, lines, indent + 1)
+
+def emit_decoder(inst, tree):
+    lines = ["def decode(x):"]
+    emit_tree(inst, tree, lines, 1)
+    return "\n".join(lines) + "\n"
+
+# Field kinds (see ezh_isa.Field) whose raw value is wrapped for the listing
+WRAP = {
+    "reg": "REG[%s]",
+    "cond": "COND[%s]",
+    "addr": "Addr(%s)",
+    "hex32": "hex32(%s)",
+    "hex8": '"0x%%02X" %% (%s)',
+}
+
+def emit_value(field):
+    # Expression for a field's raw value in terms of the word x
+    terms = []
+    mask = 0
+    for (shift, part_mask) in field.parts:
+        terms.append("x >> %d & 0x%X" % (shift, part_mask) if shift else "x & 0x%X" % part_mask)
+        mask |= part_mask
+    value = " + ".join("(" + term + ")" for term in terms) if len(terms) > 1 else terms[0]
+    if field.kind == "sint":
+        sign = 1 << (mask.bit_length() - 1)
+        value = "((%s) ^ 0x%X) - 0x%X" % (value, sign, sign)
+    return value
+
+def emit_field(field):
+    if field.kind not in WRAP and field.kind not in ("uint", "sint"):
+        raise IsaError("Unknown field kind " + repr(field.kind))
+    return WRAP.get(field.kind, "%s") % emit_value(field)
+
+def emit_extractors(inst):
+    # Two functions per entry returning its operand tuple, as listed (EXTRACT)
+    # and as raw values (RAW, see ezh_isa.raw_value)
+    lines = []
+    for (index, (mnemonic, _, _, fields)) in enumerate(inst):
+        lines.append("def extract_%d(x):  # %s" % (index, mnemonic))
+        lines.append("    return (" + "".join(emit_field(field) + ", " for field in fields) + ")")
+        lines.append("def raw_%d(x):" % index)
+        lines.append("    return (" + "".join(emit_value(field) + ", " for field in fields) + ")")
+    lines.append("EXTRACT = (" + ", ".join("extract_%d" % index for index in range(len(inst))) + ")")
+    lines.append("RAW = (" + ", ".join("raw_%d" % index for index in range(len(inst))) + ")")
+    return "\n".join(lines) + "\n"
+
+def compile_isa_code(inst):
+    check_disjoint(inst)
+    return compile(emit_decoder(inst, build_tree(inst)) + emit_extractors(inst), "<ezh_isa decoder>", "exec")
+
+def isa_namespace(isa, code):
+    # The generated code runs against the REG/COND tables and helpers of isa
+    namespace = {name: getattr(isa, name) for name in ("REG", "COND", "Addr", "hex32")}
+    exec(code, namespace)
+    return namespace
+
+def compile_isa(isa):
+    # Returns (decode, extract, raw) for the table isa.INST: decode(x) gives
+    # the index of the matching entry, or -1, and extract[index](x) and
+    # raw[index](x) its operands
+    namespace = isa_namespace(isa, compile_isa_code(isa.INST))
+    return (namespace["decode"], namespace["EXTRACT"], namespace["RAW"])
+
+def check_extractors(isa, compiled, samples=64, seed=0):
+    # Checks the compiled (decode, extract, raw) against ezh_isa.raw_value and
+    # ezh_isa.operand on random words of every entry; raises IsaError naming
+    # the first word they disagree on
+    import random
+    import ezh_isa
+    (decode, extract, raw) = compiled
+    rng = random.Random(seed)
+    for (index, (mnemonic, codemask, code, fields)) in enumerate(isa.INST):
+        for _ in range(samples):
+            x = code & codemask | rng.getrandbits(32) & ~codemask
+            values = tuple(ezh_isa.raw_value(field, x) for field in fields)
+            if decode(x) != index or raw[index](x) != values or \
+                    extract[index](x) != tuple(ezh_isa.operand(field, v) for (field, v) in zip(fields, values)):
+                raise IsaError("Compiled decoder disagrees with ezh_isa for %s at 0x%08X" % (mnemonic, x))
+
+def source_key(paths, *data):
+    # Hex digest of the bytecode format, the files at paths and any further
+    # bytes, for caches only valid while all of them stay the same
+    h = hashlib.sha1(sys.implementation.cache_tag.encode())
+    for path in paths:
+        with open(path, "rb") as fh:
+            h.update(fh.read())
+    for d in data:
+        h.update(d)
+    return h.hexdigest()
+
+def table_key(inst):
+    # Hex digest of an instruction table, for what was built from it
+    return hashlib.sha1(repr([(m, cm, c, [tuple(f) for f in fields]) for (m, cm, c, fields) in inst]).encode()).hexdigest()
+
+def write_atomic(path, data):
+    # Replaces the file at path with the bytes data, so a reader never sees
+    # it half written; raises OSError
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".%d" % os.getpid()
+    with open(tmp_path, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp_path, path)
+
+def write_cache(path, data):
+    # write_atomic for a file under __pycache__, unless bytecode writing is off
+    # (python3 -B, PYTHONDONTWRITEBYTECODE) or it can't
+    if sys.dont_write_bytecode:
+        return
+    try:
+        write_atomic(path, data)
+    except OSError:
+        pass
+
+def cache_key(isa_file):
+    # The cached code is only valid for this table, this compiler and this
+    # bytecode format
+    return source_key((isa_file, __file__))
+
+def cache_path(isa_file):
+    return os.path.join(os.path.dirname(os.path.abspath(isa_file)), "__pycache__", CACHE_NAME)
+
+def load_isa(isa):
+    # Like compile_isa, but reuses the code frozen in __pycache__ while the
+    # source of isa is unchanged
+    code = None
+    try:
+        with open(cache_path(isa.__file__), "rb") as fh:
+            (key, length, cached_code) = marshal.load(fh)
+        if key == cache_key(isa.__file__) and length == len(isa.INST):
+            code = cached_code
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    if code == None:
+        code = compile_isa_code(isa.INST)
+        write_cache(cache_path(isa.__file__), marshal.dumps((cache_key(isa.__file__), len(isa.INST), code)))
+    namespace = isa_namespace(isa, code)
+    return (namespace["decode"], namespace["EXTRACT"], namespace["RAW"])
+
+if __name__ == "__main__":
+    import ezh_isa
+    try:
+        check_disjoint(ezh_isa.INST)
+        tree = build_tree(ezh_isa.INST)
+    except IsaError as e:
+        print(e)
+        sys.exit(1)
+    print(len(ezh_isa.INST), "instruction mnemonics, pairwise disjoint")
+    print("Decision tree depth", tree_depth(tree))
+    code = compile_isa_code(ezh_isa.INST)
+    namespace = isa_namespace(ezh_isa, code)
+    try:
+        check_extractors(ezh_isa, (namespace["decode"], namespace["EXTRACT"], namespace["RAW"]))
+    except IsaError as e:
+        print(e)
+        sys.exit(1)
+    print("Extractors match ezh_isa.raw_value and ezh_isa.operand")
+    write_atomic(cache_path(ezh_isa.__file__), marshal.dumps((cache_key(ezh_isa.__file__), len(ezh_isa.INST), code)))
+    print("Wrote", cache_path(ezh_isa.__file__))
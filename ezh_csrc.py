@@ -0,0 +1,180 @@
+# Streaming reader for firmware arrays in C sources (for ezhdis.py -p)
+# Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import re
+
+CHUNK = 1 << 16
+
+TOKEN = re.compile(r"""
+    (?:\s+|/\*.*?\*/|//[^\n]*)*
+    (?:
+        (?P<number>(?:0[xX][0-9a-fA-F]+|[0-9]+)[uUlL]*)
+        | (?P<name>[A-Za-z_][A-Za-z_0-9]*)
+        | (?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+        | (?P<punct>.)
+    )?
+""", re.S | re.X)
+
+# Everything an integer initializer list may hold, and the integers within it
+BODY = re.compile(r"(?:\s+|,|/\*.*?\*/|//[^\n]*|-?[ \t]*(?:0[xX][0-9a-fA-F]+|[0-9]+)[uUlL]*)*", re.S)
+ITEM = re.compile(r"(,)|(-?)[ \t]*(?:0[xX]([0-9a-fA-F]+)|([0-9]+))[uUlL]*")
+COMMENT = re.compile(r"/\*.*?\*/|//[^\n]*", re.S)
+
+def c_int(text):
+    text = text.rstrip("uUlL")
+    if text[:2] in ("0x", "0X"):
+        return int(text, 16)
+    if len(text) > 1 and text[0] == "0":
+        return int(text, 8)
+    return int(text)
+
+class CSource:
+    # Reads C text in chunks, so memory stays bounded by the chunk size and the
+    # longest line or comment. Until end of file only the text before the last
+    # newline read is known to hold complete tokens, as nothing but a block
+    # comment can span a newline.
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.buf = ""
+        self.pos = 0
+        self.end = -1
+        self.eof = False
+
+    def fill(self):
+        # Returns False once the file is exhausted
+        if self.eof:
+            return False
+        chunk = self.fh.read(CHUNK)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+        self.end = len(self.buf) if self.eof else self.buf.rfind("\n")
+        return True
+
+    def open_comment(self, pos):
+        # True if a block comment starts at pos but its end hasn't been read yet
+        if not self.buf.startswith("/*", pos) or self.buf.find("*/", pos + 2) >= 0:
+            return False
+        if self.eof:
+            raise ValueError("Unterminated comment")
+        return True
+
+    def next_token(self):
+        # Returns (kind, text) for the next token, skipping whitespace and
+        # comments, or None at end of file
+        while True:
+            if self.pos >= self.end:
+                if not self.fill():
+                    return None
+                continue
+            m = TOKEN.match(self.buf, self.pos)
+            start = m.start(m.lastgroup) if m.lastgroup else m.end()
+            if start >= self.end and not self.eof or self.open_comment(start):
+                self.pos = start
+                self.fill()
+                continue
+            self.pos = m.end()
+            if m.lastgroup:
+                return (m.lastgroup, m.group(m.lastgroup))
+
+    def tokens(self):
+        return iter(self.next_token, None)
+
+    def initializer(self, width=1):
+        # Parses the rest of a brace-enclosed integer list whose '{' was just
+        # read, packing the values little-endian, width bytes each
+        limit = 1 << (8 * width)
+        data = bytearray()
+        # Values must be separated by commas, which may also trail the last
+        after_value = False
+        while True:
+            m = BODY.match(self.buf, self.pos, max(self.pos, self.end))
+            text = self.buf[self.pos:m.end()]
+            self.pos = m.end()
+            if "/" in text:
+                text = COMMENT.sub(" ", text)
+            values = []
+            for (comma, sign, hex_digits, digits) in ITEM.findall(text):
+                if comma:
+                    if not after_value:
+                        raise ValueError("Unexpected ',' in array initializer")
+                    after_value = False
+                    continue
+                if after_value:
+                    raise ValueError("Missing ',' in array initializer")
+                after_value = True
+                values.append((-1 if sign else 1) * (int(hex_digits, 16) if hex_digits else c_int(digits)))
+            if values and not -(limit >> 1) <= min(values) <= max(values) < limit:
+                value = next(v for v in values if not -(limit >> 1) <= v < limit)
+                raise ValueError("Value %d does not fit in %d bytes" % (value, width))
+            if width == 1:
+                data += bytes([value & 0xFF for value in values])
+            else:
+                for value in values:
+                    data += (value & (limit - 1)).to_bytes(width, "little")
+            if self.pos >= self.end:
+                if not self.fill():
+                    raise ValueError("Unterminated array initializer")
+            elif self.buf.startswith("}", self.pos):
+                self.pos += 1
+                return data
+            elif self.buf.startswith("/*", self.pos):
+                # A comment running past the last complete line
+                if self.open_comment(self.pos):
+                    self.fill()
+                else:
+                    self.pos = self.buf.find("*/", self.pos + 2) + 2
+            else:
+                raise ValueError("Unexpected " + repr(self.next_token()[1]) + " in array initializer")
+
+def read_array(fh, width=1):
+    # Reads a file holding just a C array initializer, such as the -p input
+    src = CSource(fh)
+    token = src.next_token()
+    if token == None or token[1] != "{":
+        raise ValueError("Expected '{' but found " + (repr(token[1]) if token else "end of file"))
+    return src.initializer(width)
+
+ARRAY_TYPES = {"uint8_t": 1, "uint32_t": 4}
+
+def skip_initializer(src):
+    depth = 1
+    for (kind, text) in src.tokens():
+        if text == "{":
+            depth += 1
+        elif text == "}":
+            depth -= 1
+            if depth == 0:
+                return
+
+def arrays(fh):
+    # Yields (name, data, error) for every uint8_t/uint32_t array initialized
+    # with a brace list, in one pass over the file; data is None and error says
+    # why for initializers that aren't plain integer lists
+    src = CSource(fh)
+    token = src.next_token()
+    while token != None:
+        if token[1] not in ARRAY_TYPES:
+            token = src.next_token()
+            continue
+        width = ARRAY_TYPES[token[1]]
+        name = src.next_token()
+        token = src.next_token()
+        if name == None or name[0] != "name" or token == None or token[1] != "[":
+            continue
+        # Dimensions and attributes such as SDK_ALIGN(...) come before the '='
+        while token != None and token[1] not in ("=", ";", ","):
+            token = src.next_token()
+        if token == None or token[1] != "=":
+            continue
+        token = src.next_token()
+        if token == None or token[1] != "{":
+            continue
+        try:
+            yield (name[1], bytes(src.initializer(width)), None)
+        except ValueError as e:
+            skip_initializer(src)
+            yield (name[1], None, str(e))
+        token = src.next_token()
@@ -0,0 +1,147 @@
+# Machine-readable output formats for ezhdis.py -f jsonl / -f npy
+# Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import json
+import struct
+import ezh_isa
+import ezh_common
+
+# Mnemonic ids are indices into the INST table of the Disassembler (ezh_isa.INST
+# unless tables from a header are used); -1 for anything else
+
+# Instruction.kind as stored in the npy table
+KIND_CODES = {ezh_common.INST: 0, ezh_common.API: 1, ezh_common.UNKNOWN: 2, ezh_common.PARTIAL: 3, ezh_common.DATA: 4}
+
+MAX_OPERANDS = max(len(fields) for (_, _, _, fields) in ezh_isa.INST)
+
+def typed_operands(dis, inst):
+    # [(kind, raw value), ...] using the ezh_isa.Field kinds; API targets are
+    # addresses, the bytes of a partial word hex8 and a data word hex32
+    if inst.kind == ezh_common.INST:
+        index = dis.ids[inst.mnemonic]
+        return list(zip([field.kind for field in dis.inst[index][3]], dis.raw[index](inst.word)))
+    if inst.kind == ezh_common.API:
+        return [("addr", inst.operands[0])]
+    if inst.kind == ezh_common.PARTIAL:
+        return [("hex8", byte) for byte in inst.operands]
+    if inst.kind == ezh_common.DATA:
+        return [("hex32", inst.word)]
+    return []
+
+class JsonLines:
+    # One JSON object per word:
+    # {"addr": 1048576, "word": 65577, "kind": "inst", "id": 42,
+    #  "mnemonic": "E_COND_ADD_IMM", "operands": [{"kind": "cond", "value": "EU"}, ...],
+    #  "text": "E_COND_ADD_IMM(EU, PC, PC, 8)"}
+    # REG/COND operands are given by name, everything else as an integer; any
+    # notes for the word come as a list of strings under "notes"
+
+    extension = ".jsonl"
+    mode = "w"
+
+    def __init__(self, dis, source_name, out, notes=None):
+        self.dis = dis
+        self.out = out
+        self.notes = notes
+
+    def record(self, inst):
+        operands = []
+        for (kind, value) in typed_operands(self.dis, inst):
+            if kind == "reg":
+                value = ezh_isa.REG[value]
+            elif kind == "cond":
+                value = ezh_isa.COND[value]
+            operands.append({"kind": kind, "value": value})
+        record = {
+            "addr": inst.addr,
+            "word": inst.word,
+            "kind": inst.kind,
+            "id": self.dis.ids.get(inst.mnemonic, -1),
+            "mnemonic": inst.mnemonic,
+            "operands": operands,
+            "text": inst.text,
+        }
+        if self.notes and inst.addr in self.notes:
+            record["notes"] = self.notes[inst.addr]
+        return record
+
+    def write(self, insts, verbose=True):
+        lines = []
+        count = 0
+        unknown = 0
+        for inst in insts:
+            count += 1
+            unknown += ezh_common.report(inst, verbose)
+            lines.append(json.dumps(self.record(inst), separators=(",", ":")) + "\n")
+            if len(lines) >= ezh_common.WRITE_CHUNK:
+                self.out.write("".join(lines))
+                lines.clear()
+        self.out.write("".join(lines))
+        return (count, unknown)
+
+    def close(self):
+        pass
+
+# Fixed-width little-endian records, one per word, in a NumPy .npy file so
+# np.load(path, mmap_mode="r") gives a structured array to query in place.
+# Without NumPy, skip the header (its length is the uint16 at offset 8, plus
+# 10) and use RECORD.iter_unpack. operands holds raw values (REG/COND indices,
+# sign-extended immediates), unused slots 0; count says how many are used.
+NPY_DTYPE = [
+    ("addr", "<u4"),
+    ("word", "<u4"),
+    ("id", "<i2"),
+    ("kind", "u1"),
+    ("count", "u1"),
+    ("operands", "<i8", (MAX_OPERANDS,)),
+]
+RECORD = struct.Struct("<IIhBB%dq" % MAX_OPERANDS)
+
+def npy_header(count):
+    # Format version 1.0; the shape is padded to a fixed width so the header
+    # can be rewritten in place once the count is known
+    text = "{'descr': %r, 'fortran_order': False, 'shape': (%20d,), }" % (NPY_DTYPE, count)
+    text += " " * (-(10 + len(text) + 1) % 64) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(text)) + text.encode("latin-1")
+
+class NpyTable:
+    # Fixed-width records have no room for notes, so they are dropped
+
+    extension = ".npy"
+    mode = "wb"
+
+    def __init__(self, dis, source_name, out, notes=None):
+        if not out.seekable():
+            raise ValueError("npy output needs a seekable file")
+        self.dis = dis
+        self.out = out
+        self.start = out.tell()
+        self.count = 0
+        out.write(npy_header(0))
+
+    def write(self, insts, verbose=True):
+        records = []
+        count = 0
+        unknown = 0
+        padding = (0,) * MAX_OPERANDS
+        for inst in insts:
+            count += 1
+            unknown += ezh_common.report(inst, verbose)
+            values = [value for (kind, value) in typed_operands(self.dis, inst)]
+            records.append(RECORD.pack(inst.addr, inst.word, self.dis.ids.get(inst.mnemonic, -1),
+                KIND_CODES[inst.kind], len(values), *(tuple(values) + padding)[:MAX_OPERANDS]))
+            if len(records) >= ezh_common.WRITE_CHUNK:
+                self.out.write(b"".join(records))
+                records.clear()
+        self.out.write(b"".join(records))
+        self.count += count
+        return (count, unknown)
+
+    def close(self):
+        end = self.out.tell()
+        self.out.seek(self.start)
+        self.out.write(npy_header(self.count))
+        self.out.seek(end)
+
+FORMATS = {"jsonl": JsonLines, "npy": NpyTable}
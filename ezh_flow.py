@@ -0,0 +1,247 @@
+# Control-flow recovery for disassembled EZH images (ezhdis.py -g): basic
+# blocks, call graph and the code reached from each API entry point
+# Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import array
+import collections
+import ezh_isa
+import ezh_common
+
+# Transfers with a static target: mnemonic -> (target operand, is a call)
+DIRECT = {
+    "E_GOSUB": (0, True),
+    "E_COND_GOTO": (1, False),
+    "E_COND_GOTOL": (1, True),
+}
+
+# Transfers through a register, whose targets are unknown here; the
+# VECTORED_HOLD family jumps through the vector table its register points at
+INDIRECT_CALLS = {"E_COND_GOTO_REGL"}
+INDIRECT_JUMPS = {
+    "E_COND_GOTO_REG",
+    "E_COND_VECTORED_HOLD",
+    "E_COND_VECTORED_HOLD_NRA",
+    "E_COND_VECTORED_HOLD_LV",
+    "E_COND_VECTORED_HOLD_LV_NRA",
+    "E_COND_ACC_VECTORED_HOLD",
+    "E_COND_ACC_VECTORED_HOLD_NRA",
+    "E_COND_ACC_VECTORED_HOLD_LV",
+    "E_COND_ACC_VECTORED_HOLD_LV_NRA",
+}
+
+# PC plus or minus an immediate into PC is a jump with a static target; PC
+# reads as the address of the instruction plus 4
+PC_RELATIVE_JUMPS = {"E_COND_ADD_IMM": 1, "E_COND_SUB_IMM": -1}
+
+# Loads through PC (LDR(cond, dest, PC, offset)), whose offset counts in
+# units of the access size, read literals from the image: mnemonic -> size.
+# The _PRE and _POST forms write the pointer back, so through PC they jump.
+PC_RELATIVE_LOADS = {"E_COND_LDR": 4, "E_COND_LDRB": 1, "E_COND_LDRBS": 1}
+
+# end is the address after the last instruction; succs are the blocks control
+# can pass to within the function, calls the entries of called functions
+Block = collections.namedtuple("Block", ["start", "end", "succs", "calls", "indirect"])
+
+def literal(inst):
+    # Address of the literal a PC-relative load reads, or None
+    if inst.kind != ezh_common.INST or inst.mnemonic not in PC_RELATIVE_LOADS or inst.operands[2] != "PC":
+        return None
+    return (inst.addr + 4 + PC_RELATIVE_LOADS[inst.mnemonic] * inst.operands[3]) & 0xFFFFFFFC
+
+def transfer(inst):
+    # Returns (target, call, falls_through) for an instruction ending a block,
+    # with target None if it isn't static, or None for straight-line code. A
+    # TIGHT_LOOP repeats the code after it in place, so counts as straight-line.
+    if inst.kind != ezh_common.INST:
+        return (None, False, False)
+    mnemonic = inst.mnemonic
+    if mnemonic in DIRECT:
+        (operand, call) = DIRECT[mnemonic]
+        return (int(inst.operands[operand]), call, call or inst.operands[0] != "EU")
+    if mnemonic in INDIRECT_CALLS:
+        return (None, True, True)
+    if mnemonic in INDIRECT_JUMPS:
+        return (None, False, inst.operands[0] != "EU")
+    if mnemonic in PC_RELATIVE_JUMPS and inst.operands[1] == "PC" and inst.operands[2] == "PC":
+        target = inst.addr + 4 + PC_RELATIVE_JUMPS[mnemonic] * inst.operands[3]
+        return (target & 0xFFFFFFFF, False, inst.operands[0] != "EU")
+    # Writing PC (see ezh_isa.written_operands) makes any other instruction
+    # a computed jump
+    if len(inst.operands) > 1 and any(inst.operands[i] == "PC" for i in ezh_isa.written_operands(mnemonic)):
+        return (None, False, inst.operands[0] != "EU")
+    return None
+
+class Flow:
+    # Built in time linear in the number of words: a worklist walk marks
+    # reached words and block leaders, then one pass cuts the blocks
+
+    def __init__(self, insts, entries=None):
+        # insts is the complete list of records of one image; entries default
+        # to the API table targets, or the first code word without one
+        self.insts = insts
+        self.base = insts[0].addr if insts else 0
+        self.apis = [(int(inst.operands[0]), i) for (i, inst) in enumerate(insts) if inst.kind == ezh_common.API]
+        if entries == None:
+            entries = [target for (target, i) in self.apis]
+            if not entries and insts:
+                entries = [insts[0].addr]
+        self.entries = entries
+        self.refs = collections.defaultdict(list)
+        for (target, i) in self.apis:
+            self.refs[target].append("API %d" % i)
+        self.walk()
+        self.cut()
+        self.functions = {}
+        self.call_graph = {}
+        for entry in sorted(set(self.entries) | self.call_targets):
+            if self.block_at(entry) != None:
+                # Blocks of the function at entry, and the functions it calls
+                blocks = self.closure([entry], calls=False)
+                self.functions[entry] = blocks
+                self.call_graph[entry] = sorted(set(callee for start in blocks for callee in self.block_at(start).calls))
+
+    def index(self, addr):
+        # Word index of addr, or -1 outside the image
+        i = (addr - self.base) >> 2
+        return i if 0 <= i < len(self.insts) and (addr - self.base) & 0x3 == 0 else -1
+
+    def walk(self):
+        n = len(self.insts)
+        self.reached = bytearray(n)
+        self.leader = bytearray(n)
+        self.call_targets = set()
+        # Word index -> addresses of the PC-relative loads that read it
+        self.literals = collections.defaultdict(list)
+        work = []
+        for entry in self.entries:
+            i = self.index(entry)
+            if i >= 0:
+                self.leader[i] = 1
+                work.append(i)
+        while work:
+            i = work.pop()
+            while 0 <= i < n and not self.reached[i]:
+                self.reached[i] = 1
+                addr = literal(self.insts[i])
+                if addr != None and self.index(addr) >= 0:
+                    self.literals[self.index(addr)].append(self.insts[i].addr)
+                t = transfer(self.insts[i])
+                if t == None:
+                    i += 1
+                    continue
+                (target, call, falls) = t
+                if target != None:
+                    self.refs[target].append("0x%08X" % self.insts[i].addr)
+                    if call:
+                        self.call_targets.add(target)
+                    j = self.index(target)
+                    if j >= 0:
+                        self.leader[j] = 1
+                        work.append(j)
+                if not falls:
+                    break
+                i += 1
+                if i < n:
+                    self.leader[i] = 1
+
+    def cut(self):
+        self.blocks = []
+        self.block_index = array.array("i", [-1]) * len(self.insts)
+        i = 0
+        n = len(self.insts)
+        while i < n:
+            if not self.reached[i]:
+                i += 1
+                continue
+            start = i
+            t = transfer(self.insts[i])
+            while t == None and i + 1 < n and self.reached[i + 1] and not self.leader[i + 1]:
+                i += 1
+                t = transfer(self.insts[i])
+            succs = []
+            calls = []
+            indirect = False
+            if t == None:
+                if i + 1 < n and self.reached[i + 1]:
+                    succs.append(self.insts[i + 1].addr)
+            else:
+                (target, call, falls) = t
+                if target == None:
+                    indirect = self.insts[i].kind == ezh_common.INST
+                elif call:
+                    calls.append(target)
+                else:
+                    succs.append(target)
+                if falls and i + 1 < n:
+                    succs.append(self.insts[i + 1].addr)
+            for k in range(start, i + 1):
+                self.block_index[k] = len(self.blocks)
+            self.blocks.append(Block(self.insts[start].addr, self.insts[i].addr + 4, succs, calls, indirect))
+            i += 1
+
+    def block_at(self, addr):
+        # The block holding addr, or None if addr isn't reached code
+        i = self.index(addr)
+        if i < 0 or self.block_index[i] < 0:
+            return None
+        return self.blocks[self.block_index[i]]
+
+    def closure(self, starts, calls=True):
+        # Sorted start addresses of the blocks reachable from starts, following
+        # calls too unless calls is False
+        seen = set()
+        work = list(starts)
+        while work:
+            block = self.block_at(work.pop())
+            if block == None or block.start in seen:
+                continue
+            seen.add(block.start)
+            work.extend(block.succs)
+            if calls:
+                work.extend(block.calls)
+        return sorted(seen)
+
+    def regions(self, entry):
+        # (start, end) address ranges of the code reachable from entry,
+        # adjacent blocks merged
+        ranges = []
+        for start in self.closure([entry]):
+            end = self.block_at(start).end
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        return ranges
+
+    def notes(self):
+        # Listing comments: a label at every block start naming what branches
+        # there, and a mark at the start of every unreached run of words
+        notes = {}
+        for block in self.blocks:
+            refs = self.refs.get(block.start)
+            notes[block.start] = ["L_%08X" % block.start + (" (from " + ", ".join(refs) + ")" if refs else "")]
+        for i in range(len(self.insts)):
+            if not self.reached[i] and (i == 0 or self.reached[i - 1]) and self.insts[i].kind != ezh_common.API:
+                notes[self.insts[i].addr] = ["Not reached from any entry point"]
+        for (i, loads) in self.literals.items():
+            if self.reached[i]:
+                notes.setdefault(self.insts[i].addr, []).append("Also loaded as data by " + ", ".join("0x%08X" % a for a in loads))
+        return notes
+
+    def is_data(self, i):
+        # Words outside reached code, other than the API table and a partial
+        # last word. A literal that code also runs through (camera_engine
+        # loads the jump at 0x00010028 into CFS) stays an instruction.
+        return self.insts[i].kind in (ezh_common.INST, ezh_common.UNKNOWN) and not self.reached[i]
+
+    def data_records(self):
+        # The records with every data word replaced by a DCD of it
+        records = []
+        for (i, inst) in enumerate(self.insts):
+            if self.is_data(i):
+                loads = self.literals.get(i)
+                comment = "Data, loaded by " + ", ".join("0x%08X" % a for a in loads) if loads else "Data"
+                inst = ezh_common.Instruction(inst.addr, inst.word, ezh_common.DATA, "DCD", (inst.word,), "DCD 0x%08X" % inst.word, comment)
+            records.append(inst)
+        return records
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+# Load address and API table size inferred from an EZH image (ezhdis.py -i):
+# the leading words that look like entry pointers, and the load address that
+# puts the most GOSUB/GOTO targets on instructions in the image
+# Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import sys
+import bisect
+import collections
+import ezh_common
+import ezh_flow
+
+DEFAULT_LOAD_ADDR = 0x00100000
+
+# Below this share of branch targets on instructions, or with another load
+# address scoring as well, the guess is reported as low confidence
+CONFIDENT = 0.9
+
+# load_addr and num_apis are the guess. Of the targets branches in the image
+# name, hits land on instructions at load_addr, and starts of those right
+# after a word control can't fall through (a jump, a return, a hold) or the
+# API table. ties counts the other load addresses that score as well,
+# runner_up is the best one that doesn't (or None). candidates is how many
+# leading words look like entry pointers, and adjacent says whether the first
+# API entry follows the table directly.
+Guess = collections.namedtuple("Guess", ["load_addr", "num_apis", "hits", "starts", "targets", "ties", "runner_up", "candidates", "adjacent"])
+
+def entry_candidates(words):
+    # Number of leading words that could be API entries: a word-aligned 24-bit
+    # pointer under the same flag byte as the first
+    flags = words[0] >> 24 if len(words) else 0
+    k = 0
+    while k < len(words) and words[k] & 0x3 == 0 and words[k] >> 24 == flags:
+        k += 1
+    return k
+
+def branch_targets(dis, words, start):
+    # Counter of the static branch targets named by words[start:]
+    targets = collections.Counter()
+    for x in words[start:]:
+        index = dis.decode(x)
+        if index >= 0:
+            direct = ezh_flow.DIRECT.get(dis.inst[index][0])
+            if direct != None:
+                targets[dis.raw[index](x)[direct[0]]] += 1
+    return targets
+
+def api_size(words, k, code, load_addr):
+    # Largest table of at most k entries that all point at instructions after it
+    n = len(code)
+    num_apis = 0
+    while num_apis < k:
+        j = ((words[num_apis] & 0x00FFFFFF) - load_addr) >> 2
+        if not num_apis < j < n or not code[j]:
+            break
+        num_apis += 1
+    while num_apis and min(words[i] & 0x00FFFFFF for i in range(num_apis)) < load_addr + 4 * num_apis:
+        num_apis -= 1
+    return num_apis
+
+def candidate_addrs(ts, weights, size):
+    # Load addresses that put the most targets inside an image of size bytes:
+    # for each densest window of targets, those that keep all of it inside
+    best = 0
+    windows = []
+    j = 0
+    total = 0
+    for i in range(len(ts)):
+        while j < len(ts) and ts[j] < ts[i] + size:
+            total += weights[j]
+            j += 1
+        if total > best:
+            best = total
+            windows = []
+        if total == best:
+            windows.append((ts[j - 1] - size + 4, ts[i]))
+        total -= weights[i]
+    addrs = set()
+    for (lo, hi) in windows:
+        addrs.update(range(max(0, lo) & ~0x3, hi + 1, 4))
+    return addrs
+
+def infer(dis, buffer, load_addr=None):
+    # Returns the Guess for a bytes-like image, only sizing the API table if
+    # load_addr is given
+    (words, tail) = ezh_common.as_words(buffer)
+    n = len(words)
+    if n == 0:
+        return Guess(DEFAULT_LOAD_ADDR, 0, 0, 0, 0, 0, None, 0, False)
+    code = bytearray(dis.decode(x) >= 0 for x in words)
+    # Whether control falls through each word doesn't depend on where it is
+    ends = bytearray()
+    for inst in dis.records(words, b"", 0):
+        t = ezh_flow.transfer(inst)
+        ends.append(t != None and not t[2])
+    k = entry_candidates(words)
+    targets = branch_targets(dis, words, k)
+    ts = sorted(targets)
+    weights = [targets[t] for t in ts]
+
+    def score(load_addr):
+        # (hits, starts, API entries, first entry follows the table)
+        num_apis = api_size(words, k, code, load_addr)
+        lo = bisect.bisect_left(ts, load_addr + 4 * num_apis)
+        hi = bisect.bisect_left(ts, load_addr + 4 * n)
+        hits = 0
+        starts = 0
+        for i in range(lo, hi):
+            j = (ts[i] - load_addr) >> 2
+            if code[j]:
+                hits += weights[i]
+                if j == num_apis or ends[j - 1]:
+                    starts += weights[i]
+        adjacent = num_apis > 0 and min(words[i] & 0x00FFFFFF for i in range(num_apis)) == load_addr + 4 * num_apis
+        return (hits, starts, num_apis, adjacent)
+
+    if load_addr != None:
+        (hits, starts, num_apis, adjacent) = score(load_addr)
+        return Guess(load_addr, num_apis, hits, starts, sum(weights), 0, None, k, adjacent)
+    addrs = candidate_addrs(ts, weights, 4 * n)
+    if k:
+        # A table followed directly by code also places the image
+        addrs.add(max(0, (words[0] & 0x00FFFFFF) - 4 * k))
+    addrs.add(DEFAULT_LOAD_ADDR)
+    scored = {}
+    for load_addr in addrs:
+        # With most words decoding to something, moving the image by a word
+        # or two often keeps every hit; starts tell those apart
+        (hits, starts, num_apis, adjacent) = score(load_addr)
+        scored[load_addr] = (hits + starts + num_apis, adjacent, load_addr == DEFAULT_LOAD_ADDR, -load_addr)
+    ranked = sorted(scored, key=scored.get, reverse=True)
+    best = ranked[0]
+    ties = sum(scored[a][:2] == scored[best][:2] for a in ranked[1:])
+    runner_up = next((a for a in ranked if scored[a][:2] < scored[best][:2]), None)
+    (hits, starts, num_apis, adjacent) = score(best)
+    if hits == 0:
+        # Nothing places the image; a lone pointer-like first word doesn't
+        best = DEFAULT_LOAD_ADDR
+        runner_up = None
+        ties = 0
+        (hits, starts, num_apis, adjacent) = score(best)
+    return Guess(best, num_apis, hits, starts, sum(weights), ties, runner_up, k, adjacent)
+
+def confident(guess):
+    return guess.hits > 0 and guess.hits >= CONFIDENT * guess.targets and guess.ties == 0
+
+def summary(guess):
+    # One line for batch output
+    return "load address 0x%08X, %d API entries, %s confidence" % (guess.load_addr, guess.num_apis, "high" if confident(guess) else "low")
+
+def report(guess):
+    # Lines of the confidence report
+    lines = ["Inferred " + summary(guess)]
+    if guess.targets:
+        lines.append("  %d of %d branch targets land on instructions (%.0f%%), %d of them after a jump, return or hold" % (
+            guess.hits, guess.targets, 100.0 * guess.hits / guess.targets, guess.starts))
+    else:
+        lines.append("  no static branch targets to place the image by")
+    if guess.ties:
+        lines.append("  %d other load addresses score as well" % guess.ties)
+    if guess.runner_up != None:
+        lines.append("  next best load address 0x%08X" % guess.runner_up)
+    lines.append("  %d leading words look like entry pointers, %d point at instructions after the table%s" % (
+        guess.candidates, guess.num_apis, ", the first right after it" if guess.adjacent else ""))
+    return lines
+
+if __name__ == "__main__":
+    import ezhdis
+    if len(sys.argv) < 2:
+        print("Usage:", sys.argv[0], "image.bin ...")
+        sys.exit(1)
+    dis = ezhdis.Disassembler()
+    for bin_file in sys.argv[1:]:
+        with open(bin_file, "rb") as fh:
+            guess = infer(dis, ezh_common.map_image(fh))
+        print(bin_file + ":")
+        for line in report(guess):
+            print(line)
@@ -7,17 +7,120 @@
 # 0x19 (register-specified shift)
 # 0x1D (load/store with register-specified offset)
 
+import functools
+import collections
 from peripheral_regs import PERIPH_REGS_RT5XX as PERIPH_REGS
 
 def signed(value, bits):
     sign_bit = 1 << (bits - 1)
     return (value & (sign_bit - 1)) - (value & sign_bit)
 
-def addr(x):
-    if ENABLE_PERIPH_REGS:
-        return PERIPH_REGS[x] if x in PERIPH_REGS else "0x%08X" % x
+@functools.lru_cache(maxsize=4096)
+def hex32(x):
     return "0x%08X" % x
 
+class Addr(int):
+    # Address operand; the disassembler may render it as a PERIPH_REGS name instead
+    def __str__(self):
+        return hex32(self)
+
+# Operand fields are plain data, which ezh_compile turns into one fused
+# extraction function per instruction (and ezh_numpy into array operations).
+# A field's raw value is the sum of (x >> shift) & mask over its parts; kind
+# says how to read it:
+#   uint, sint    integer (sint is two's complement over the field's width)
+#   reg, cond     index into REG/COND
+#   addr          Addr, which the disassembler may name from PERIPH_REGS
+#   hex32, hex8   integer shown as 8 or 2 hex digits
+Field = collections.namedtuple("Field", ["kind", "parts"])
+
+def bits(shift, mask):
+    return (shift, mask)
+
+def uint(*parts):
+    return Field("uint", parts)
+
+def sint(*parts):
+    return Field("sint", parts)
+
+def reg(shift):
+    return Field("reg", (bits(shift, 0xF),))
+
+def cond(shift):
+    return Field("cond", (bits(shift, 0xF),))
+
+def address(*parts):
+    return Field("addr", parts)
+
+def hexword(*parts):
+    return Field("hex32", parts)
+
+def hexbyte(*parts):
+    return Field("hex8", parts)
+
+def field_width(field):
+    mask = 0
+    for (shift, part_mask) in field.parts:
+        mask |= part_mask
+    return mask.bit_length()
+
+def field_bits(field):
+    # Bits of the word the field is read from
+    word = 0
+    for (shift, mask) in field.parts:
+        word |= mask << shift
+    return word & 0xFFFFFFFF
+
+def spare_bits(entry):
+    # Bits of the word neither the code nor any operand of an INST entry covers
+    (_, codemask, _, fields) = entry
+    for field in fields:
+        codemask |= field_bits(field)
+    return ~codemask & 0xFFFFFFFF
+
+def raw_value(field, x):
+    # Reference semantics for the compiled extractors, which python3
+    # ezh_compile.py checks against this and operand()
+    value = 0
+    for (shift, mask) in field.parts:
+        value += (x >> shift) & mask
+    if field.kind == "sint":
+        return signed(value, field_width(field))
+    return value
+
+def operand(field, value):
+    # Listing operand for a raw value
+    if field.kind == "reg":
+        return REG[value]
+    if field.kind == "cond":
+        return COND[value]
+    if field.kind == "addr":
+        return Addr(value)
+    if field.kind == "hex32":
+        return hex32(value)
+    if field.kind == "hex8":
+        return "0x%02X" % value
+    return value
+
+# Instructions whose second operand is a register they don't write: STR's is
+# its pointer, and the rest only read it. Any other instruction with a
+# register there writes it (BTST included, as the header's dest says).
+NO_DEST = ("E_COND_STR", "E_COND_PER_WRITE", "E_COND_TIGHT_LOOP", "E_COND_GOTO_REG", "E_COND_VECTORED", "E_COND_ACC_VECTORED")
+
+def written_operands(mnemonic):
+    # Indices of the register operands an instruction writes, for one whose
+    # second operand is a register; the _PRE and _POST forms also write back
+    # their pointer
+    indices = [] if mnemonic.startswith(NO_DEST) else [1]
+    if mnemonic.endswith(("_PRE", "_POST")):
+        indices.append(2 if mnemonic.startswith("E_COND_LDR") else 1)
+    return indices
+
+# Bits the SDK's macros set that the entries below don't test, so decoding
+# ignores them but the assembler must give them back: HOLD is
+# 0x1C + (PC << 10) + ... in fsl_smartdma_prv.h
+ENCODE_BITS = {"E_COND_HOLD": 0xD << 10}
+
 OPMASK = 0x1F
 
 REG = {
@@ -63,426 +166,426 @@ COND = {
 INST = [
     ("E_GOSUB", 0x3,
     0x3, [
-        lambda x: addr(x & 0xFFFFFFF8),
+        address(bits(0, 0xFFFFFFF8)),
     ]),
     ("E_NOP", 0xFF,
     0x12, [
     ]),
     ("E_INT_TRIGGER", 0xFF,
     0x14, [
-        lambda x: "0x%08X" % (x >> 8),
+        hexword(bits(8, 0x00FFFFFF)),
     ]),
 
 
 
     ("E_COND_GOTO", OPMASK + (1 << 9) + (1 << 10),
     0x15 + (1 << 9), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: addr((x >> 9) & ~0x3),
+        cond(5),
+        address(bits(9, 0x007FFFFC)),
     ]),
     ("E_COND_GOTO_REG", OPMASK + (1 << 9) + (1 << 10),
     0x15, [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
+        cond(5),
+        reg(14),
     ]),
     ("E_COND_GOTOL", OPMASK + (1 << 9) + (1 << 10),
     0x15 + (1 << 9) + (1 << 10), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: addr((x >> 9) & ~0x3),
+        cond(5),
+        address(bits(9, 0x007FFFFC)),
     ]),
     ("E_COND_GOTO_REGL", OPMASK + (1 << 9) + (1 << 10),
     0x15 + (1 << 10), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
+        cond(5),
+        reg(14),
     ]),
 
 
 
     ("E_COND_MOV", OPMASK + (1 << 9) + (1 << 18) + (1 << 31),
     0x0, [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
+        cond(5),
+        reg(10),
+        reg(14),
     ]),
     ("E_COND_MOVS", OPMASK + (1 << 9) + (1 << 18) + (1 << 31),
     0x0 + (1 << 9), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
+        cond(5),
+        reg(10),
+        reg(14),
     ]),
     ("E_COND_MVN", OPMASK + (1 << 9) + (1 << 18) + (1 << 31),
     0x0 + (1 << 31), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
+        cond(5),
+        reg(10),
+        reg(14),
     ]),
     ("E_COND_MVNS", OPMASK + (1 << 9) + (1 << 18) + (1 << 31),
     0x0 + (1 << 9) + (1 << 31), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
+        cond(5),
+        reg(10),
+        reg(14),
     ]),
     ("E_COND_LOAD_SIMM", OPMASK + (1 << 9) + (1 << 18) + (1 << 31),
     0x0 + (1 << 18), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: signed((x >> 20) & 0x7FF, 11),
-        lambda x: ((x >> 14) & 0xF) + ((x >> (19 - 4)) & 0x10),
+        cond(5),
+        reg(10),
+        sint(bits(20, 0x7FF)),
+        uint(bits(14, 0xF), bits(19 - 4, 0x10)),
     ]),
     ("E_COND_LOAD_SIMMS", OPMASK + (1 << 9) + (1 << 18) + (1 << 31),
     0x0 + (1 << 9) + (1 << 18), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: signed((x >> 20) & 0x7FF, 11),
-        lambda x: ((x >> 14) & 0xF) + ((x >> (19 - 4)) & 0x10),
+        cond(5),
+        reg(10),
+        sint(bits(20, 0x7FF)),
+        uint(bits(14, 0xF), bits(19 - 4, 0x10)),
     ]),
     ("E_COND_LOAD_SIMMN", OPMASK + (1 << 9) + (1 << 18) + (1 << 31),
     0x0 + (1 << 18) + (1 << 31), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: signed((x >> 20) & 0x7FF, 11),
-        lambda x: ((x >> 14) & 0xF) + ((x >> (19 - 4)) & 0x10),
+        cond(5),
+        reg(10),
+        sint(bits(20, 0x7FF)),
+        uint(bits(14, 0xF), bits(19 - 4, 0x10)),
     ]),
     ("E_COND_LOAD_SIMMNS", OPMASK + (1 << 9) + (1 << 18) + (1 << 31),
     0x0 + (1 << 9) + (1 << 18) + (1 << 31), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: signed((x >> 20) & 0x7FF, 11),
-        lambda x: ((x >> 14) & 0xF) + ((x >> (19 - 4)) & 0x10),
+        cond(5),
+        reg(10),
+        sint(bits(20, 0x7FF)),
+        uint(bits(14, 0xF), bits(19 - 4, 0x10)),
     ]),
 
 
 
     ("E_COND_LDR", OPMASK + (1 << 18) + (1 << 19) + (1 << 20) + (1 << 21),
     0x1 + (1 << 18), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: signed((x >> 24) & 0xFF, 8),
+        cond(5),
+        reg(10),
+        reg(14),
+        sint(bits(24, 0xFF)),
     ]),
     ("E_COND_LDRB", OPMASK + (1 << 18) + (1 << 19) + (1 << 20) + (1 << 21),
     0x1, [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: signed((x >> 24) & 0xFF, 8),
+        cond(5),
+        reg(10),
+        reg(14),
+        sint(bits(24, 0xFF)),
     ]),
     ("E_COND_LDRBS", OPMASK + (1 << 18) + (1 << 19) + (1 << 20) + (1 << 21),
     0x1 + (1 << 21), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: signed((x >> 24) & 0xFF, 8),
+        cond(5),
+        reg(10),
+        reg(14),
+        sint(bits(24, 0xFF)),
     ]),
     ("E_COND_LDR_PRE", OPMASK + (1 << 18) + (1 << 19) + (1 << 20) + (1 << 21),
     0x1 + (1 << 18) + (1 << 20), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: signed((x >> 24) & 0xFF, 8),
+        cond(5),
+        reg(10),
+        reg(14),
+        sint(bits(24, 0xFF)),
     ]),
     ("E_COND_LDRB_PRE", OPMASK + (1 << 18) + (1 << 19) + (1 << 20) + (1 << 21),
     0x1 + (1 << 20), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: signed((x >> 24) & 0xFF, 8),
+        cond(5),
+        reg(10),
+        reg(14),
+        sint(bits(24, 0xFF)),
     ]),
     ("E_COND_LDRBS_PRE", OPMASK + (1 << 18) + (1 << 19) + (1 << 20) + (1 << 21),
     0x1 + (1 << 20) + (1 << 21), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: signed((x >> 24) & 0xFF, 8),
+        cond(5),
+        reg(10),
+        reg(14),
+        sint(bits(24, 0xFF)),
     ]),
     ("E_COND_LDR_POST", OPMASK + (1 << 18) + (1 << 19) + (1 << 20) + (1 << 21),
     0x1 + (1 << 18) + (1 << 19) + (1 << 20), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: signed((x >> 24) & 0xFF, 8),
+        cond(5),
+        reg(10),
+        reg(14),
+        sint(bits(24, 0xFF)),
     ]),
     ("E_COND_LDRB_POST", OPMASK + (1 << 18) + (1 << 19) + (1 << 20) + (1 << 21),
     0x1 + (1 << 19) + (1 << 20), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: signed((x >> 24) & 0xFF, 8),
+        cond(5),
+        reg(10),
+        reg(14),
+        sint(bits(24, 0xFF)),
     ]),
     ("E_COND_LDRBS_POST", OPMASK + (1 << 18) + (1 << 19) + (1 << 20) + (1 << 21),
     0x1 + (1 << 19) + (1 << 20) + (1 << 21), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: signed((x >> 24) & 0xFF, 8),
+        cond(5),
+        reg(10),
+        reg(14),
+        sint(bits(24, 0xFF)),
     ]),
 
 
 
     ("E_COND_STR", OPMASK + (1 << 18) + (1 << 19) + (1 << 10) + (1 << 11),
     0x2 + (1 << 18), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: REG[(x >> 20) & 0xF],
-        lambda x: signed((x >> 24) & 0xFF, 8),
+        cond(5),
+        reg(14),
+        reg(20),
+        sint(bits(24, 0xFF)),
     ]),
     ("E_COND_STRB", OPMASK + (1 << 18) + (1 << 19) + (1 << 10) + (1 << 11),
     0x2, [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: REG[(x >> 20) & 0xF],
-        lambda x: signed((x >> 24) & 0xFF, 8),
+        cond(5),
+        reg(14),
+        reg(20),
+        sint(bits(24, 0xFF)),
     ]),
     ("E_COND_STR_PRE", OPMASK + (1 << 18) + (1 << 19) + (1 << 10) + (1 << 11),
     0x2 + (1 << 18) + (1 << 10), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: REG[(x >> 20) & 0xF],
-        lambda x: signed((x >> 24) & 0xFF, 8),
+        cond(5),
+        reg(14),
+        reg(20),
+        sint(bits(24, 0xFF)),
     ]),
     ("E_COND_STRB_PRE", OPMASK + (1 << 18) + (1 << 19) + (1 << 10) + (1 << 11),
     0x2 + (1 << 10), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: REG[(x >> 20) & 0xF],
-        lambda x: signed((x >> 24) & 0xFF, 8),
+        cond(5),
+        reg(14),
+        reg(20),
+        sint(bits(24, 0xFF)),
     ]),
     ("E_COND_STR_POST", OPMASK + (1 << 18) + (1 << 19) + (1 << 10) + (1 << 11),
     0x2 + (1 << 18) + (1 << 19) + (1 << 10), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: REG[(x >> 20) & 0xF],
-        lambda x: signed((x >> 24) & 0xFF, 8),
+        cond(5),
+        reg(14),
+        reg(20),
+        sint(bits(24, 0xFF)),
     ]),
     ("E_COND_STRB_POST", OPMASK + (1 << 18) + (1 << 19) + (1 << 10) + (1 << 11),
     0x2 + (1 << 19) + (1 << 10), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: REG[(x >> 20) & 0xF],
-        lambda x: signed((x >> 24) & 0xFF, 8),
+        cond(5),
+        reg(14),
+        reg(20),
+        sint(bits(24, 0xFF)),
     ]),
 
 
 
     ("E_COND_PER_READ", OPMASK,
     0x4, [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: addr((x >> 12) & 0x000FFFFC),
+        cond(5),
+        reg(10),
+        address(bits(12, 0x000FFFFC)),
     ]),
 
 
 
     ("E_COND_PER_WRITE", OPMASK,
     0x5, [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 20) & 0xF],
-        lambda x: addr(((x >> 12) & 0x000FF000) + ((x >> 8) & 0x00000FFC)),
+        cond(5),
+        reg(20),
+        address(bits(12, 0x000FF000), bits(8, 0x00000FFC)),
     ]),
 
 
 
     ("E_COND_BTST", OPMASK + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31),
     0x18 + (1 << 18) + (1 << 29) + (1 << 31), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: REG[(x >> 20) & 0xF],
+        cond(5),
+        reg(10),
+        reg(14),
+        reg(20),
     ]),
     ("E_COND_BCLR", OPMASK + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31),
     0x18 + (1 << 18) + (1 << 29), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: REG[(x >> 20) & 0xF],
+        cond(5),
+        reg(10),
+        reg(14),
+        reg(20),
     ]),
     ("E_COND_BSET", OPMASK + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31),
     0x18 + (1 << 18) + (2 << 29) + (1 << 31), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: REG[(x >> 20) & 0xF],
+        cond(5),
+        reg(10),
+        reg(14),
+        reg(20),
     ]),
     ("E_COND_BTOG", OPMASK + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31),
     0x18 + (1 << 18) + (3 << 29) + (1 << 31), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: REG[(x >> 20) & 0xF],
+        cond(5),
+        reg(10),
+        reg(14),
+        reg(20),
     ]),
     ("E_COND_BTSTS", OPMASK + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31),
     0x18 + (1 << 9) + (1 << 18) + (1 << 29) + (1 << 31), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: REG[(x >> 20) & 0xF],
+        cond(5),
+        reg(10),
+        reg(14),
+        reg(20),
     ]),
     ("E_COND_BCLRS", OPMASK + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31),
     0x18 + (1 << 9) + (1 << 18) + (1 << 29), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: REG[(x >> 20) & 0xF],
+        cond(5),
+        reg(10),
+        reg(14),
+        reg(20),
     ]),
     ("E_COND_BSETS", OPMASK + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31),
     0x18 + (1 << 9) + (1 << 18) + (2 << 29) + (1 << 31), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: REG[(x >> 20) & 0xF],
+        cond(5),
+        reg(10),
+        reg(14),
+        reg(20),
     ]),
     ("E_COND_BTOGS", OPMASK + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31),
     0x18 + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: REG[(x >> 20) & 0xF],
+        cond(5),
+        reg(10),
+        reg(14),
+        reg(20),
     ]),
 
 
 
     ("E_COND_BTST_IMM", OPMASK + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31),
     0x18 + (1 << 29) + (1 << 31), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: (x >> 24) & 0x1F,
+        cond(5),
+        reg(10),
+        reg(14),
+        uint(bits(24, 0x1F)),
     ]),
     ("E_COND_BCLR_IMM", OPMASK + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31),
     0x18 + (1 << 29), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: (x >> 24) & 0x1F,
+        cond(5),
+        reg(10),
+        reg(14),
+        uint(bits(24, 0x1F)),
     ]),
     ("E_COND_BSET_IMM", OPMASK + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31),
     0x18 + (2 << 29) + (1 << 31), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: (x >> 24) & 0x1F,
+        cond(5),
+        reg(10),
+        reg(14),
+        uint(bits(24, 0x1F)),
     ]),
     ("E_COND_BTOG_IMM", OPMASK + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31),
     0x18 + (3 << 29) + (1 << 31), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: (x >> 24) & 0x1F,
+        cond(5),
+        reg(10),
+        reg(14),
+        uint(bits(24, 0x1F)),
     ]),
     ("E_COND_BTST_IMMS", OPMASK + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31),
     0x18 + (1 << 9) + (1 << 29) + (1 << 31), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: (x >> 24) & 0x1F,
+        cond(5),
+        reg(10),
+        reg(14),
+        uint(bits(24, 0x1F)),
     ]),
     ("E_COND_BCLR_IMMS", OPMASK + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31),
     0x18 + (1 << 9) + (1 << 29), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: (x >> 24) & 0x1F,
+        cond(5),
+        reg(10),
+        reg(14),
+        uint(bits(24, 0x1F)),
     ]),
     ("E_COND_BSET_IMMS", OPMASK + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31),
     0x18 + (1 << 9) + (2 << 29) + (1 << 31), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: (x >> 24) & 0x1F,
+        cond(5),
+        reg(10),
+        reg(14),
+        uint(bits(24, 0x1F)),
     ]),
     ("E_COND_BTOG_IMMS", OPMASK + (1 << 9) + (1 << 18) + (3 << 29) + (1 << 31),
     0x18 + (1 << 9) + (3 << 29) + (1 << 31), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: (x >> 24) & 0x1F,
+        cond(5),
+        reg(10),
+        reg(14),
+        uint(bits(24, 0x1F)),
     ]),
 
 
 
     ("E_COND_TIGHT_LOOP", OPMASK,
     0x1A, [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 14) & 0xF],
-        lambda x: REG[(x >> 20) & 0xF],
+        cond(5),
+        reg(14),
+        reg(20),
     ]),
 
 
 
     ("E_COND_HOLD", OPMASK + (1 << 9) + (1 << 15) + (1 << 18) + (1 << 19),
     0x1C + (1 << 15), [
-        lambda x: COND[(x >> 5) & 0xF],
+        cond(5),
     ]),
     ("E_COND_VECTORED_HOLD", OPMASK + (1 << 9) + (1 << 15) + (1 << 18) + (1 << 19),
     0x1C, [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF], # table TODO check
+        cond(5),
+        reg(10), # table TODO check
     ]),
     ("E_COND_VECTORED_HOLD_NRA", OPMASK + (1 << 9) + (1 << 15) + (1 << 18) + (1 << 19),
     0x1C + (1 << 18), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF], # table TODO check
+        cond(5),
+        reg(10), # table TODO check
     ]),
     ("E_COND_VECTORED_HOLD_LV", OPMASK + (1 << 9) + (1 << 15) + (1 << 18) + (1 << 19),
     0x1C + (1 << 19), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF], # table TODO check
+        cond(5),
+        reg(10), # table TODO check
     ]),
     ("E_COND_VECTORED_HOLD_LV_NRA", OPMASK + (1 << 9) + (1 << 15) + (1 << 18) + (1 << 19),
     0x1C + (1 << 18) + (1 << 19), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF], # table TODO check
+        cond(5),
+        reg(10), # table TODO check
     ]),
     ("E_COND_ACC_VECTORED_HOLD", OPMASK + (1 << 9) + (1 << 15) + (1 << 18) + (1 << 19),
     0x1C + (1 << 9), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF], # table TODO check
-        lambda x: REG[(x >> 24) & 0xF], # vectors TODO check
+        cond(5),
+        reg(10), # table TODO check
+        reg(24), # vectors TODO check
     ]),
     ("E_COND_ACC_VECTORED_HOLD_NRA", OPMASK + (1 << 9) + (1 << 15) + (1 << 18) + (1 << 19),
     0x1C + (1 << 9) + (1 << 18), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF], # table TODO check
-        lambda x: REG[(x >> 24) & 0xF], # vectors TODO check
+        cond(5),
+        reg(10), # table TODO check
+        reg(24), # vectors TODO check
     ]),
     ("E_COND_ACC_VECTORED_HOLD_LV", OPMASK + (1 << 9) + (1 << 15) + (1 << 18) + (1 << 19),
     0x1C + (1 << 9) + (1 << 19), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF], # table TODO check
-        lambda x: REG[(x >> 24) & 0xF], # vectors TODO check
+        cond(5),
+        reg(10), # table TODO check
+        reg(24), # vectors TODO check
     ]),
     ("E_COND_ACC_VECTORED_HOLD_LV_NRA", OPMASK + (1 << 9) + (1 << 15) + (1 << 18) + (1 << 19),
     0x1C + (1 << 9) + (1 << 18) + (1 << 19), [
-        lambda x: COND[(x >> 5) & 0xF],
-        lambda x: REG[(x >> 10) & 0xF], # table TODO check
-        lambda x: REG[(x >> 24) & 0xF], # vectors TODO check
+        cond(5),
+        reg(10), # table TODO check
+        reg(24), # vectors TODO check
     ]),
 
 
 
     ("E_MODIFY_GPO_BYTE", 0xFF,
     0x1E, [
-        lambda x: "0x%02X" % ((x >> 8) & 0xFF),
-        lambda x: "0x%02X" % ((x >> 16) & 0xFF),
-        lambda x: "0x%02X" % ((x >> 24) & 0xFF),
+        hexbyte(bits(8, 0xFF)),
+        hexbyte(bits(16, 0xFF)),
+        hexbyte(bits(24, 0xFF)),
     ]),
 
 
 
     ("E_HEART_RYTHM_IMM", 0xFF + (1 << 9),
     0x32, [
-        lambda x: (x >> 16) & 0xFFFF,
+        uint(bits(16, 0xFFFF)),
     ]),
     ("E_HEART_RYTHM", 0xFF + (1 << 9),
     0x32 + (1 << 9), [
-        lambda x: REG[(x >> 14) & 0xF],
+        reg(14),
     ]),
 
 
 
     ("E_SYNCH_ALL_TO_BEAT", 0xFF,
     0x52, [
-        lambda x: x >> 31,
+        uint(bits(31, 0x1)),
     ]),
 
 
@@ -498,287 +601,287 @@ def build_tla1(tla, op):
     return [
         (f"E_COND_{tla}_IMM", OPMASK + (1 << 9) + (1 << 18) + (1 << 19),
         op + (1 << 18), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: signed((x >> 20) & 0xFFF, 12),
+            cond(5),
+            reg(10),
+            reg(14),
+            sint(bits(20, 0xFFF)),
         ]),
         (f"E_COND_{tla}_IMMS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19),
         op + (1 << 9) + (1 << 18), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: signed((x >> 20) & 0xFFF, 12),
+            cond(5),
+            reg(10),
+            reg(14),
+            sint(bits(20, 0xFFF)),
         ]),
         (f"E_COND_{tla}N_IMM", OPMASK + (1 << 9) + (1 << 18) + (1 << 19),
         op + (1 << 18) + (1 << 19), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: signed((x >> 20) & 0xFFF, 12),
+            cond(5),
+            reg(10),
+            reg(14),
+            sint(bits(20, 0xFFF)),
         ]),
         (f"E_COND_{tla}N_IMMS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19),
         op + (1 << 9) + (1 << 18) + (1 << 19), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: signed((x >> 20) & 0xFFF, 12),
+            cond(5),
+            reg(10),
+            reg(14),
+            sint(bits(20, 0xFFF)),
         ]),
         (f"E_COND_{tla}_LSL", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op, [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_LSLS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 9), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}N_LSL", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 19), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}N_LSLS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 9) + (1 << 19), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_LSR", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 30), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_LSRS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 9) + (1 << 30), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}N_LSR", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 19) + (1 << 30), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}N_LSRS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 9) + (1 << 19) + (1 << 30), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_ASR", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_ASRS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 9) + (1 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}N_ASR", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 19) + (1 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}N_ASRS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 9) + (1 << 19) + (1 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_ROR", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 29) + (1 << 30), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_RORS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 9) + (1 << 29) + (1 << 30), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}N_ROR", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 19) + (1 << 29) + (1 << 30), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}N_RORS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 9) + (1 << 19) + (1 << 29) + (1 << 30), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_FLSL", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 31), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_FLSLS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 9) + (1 << 31), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}N_FLSL", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 19) + (1 << 31), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}N_FLSLS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 9) + (1 << 19) + (1 << 31), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_FLSR", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 30) + (1 << 31), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_FLSRS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 9) + (1 << 30) + (1 << 31), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}N_FLSR", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 19) + (1 << 30) + (1 << 31), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}N_FLSRS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 9) + (1 << 19) + (1 << 30) + (1 << 31), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_FASR", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 29) + (1 << 31), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_FASRS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 9) + (1 << 29) + (1 << 31), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}N_FASR", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 19) + (1 << 29) + (1 << 31), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}N_FASRS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 9) + (1 << 19) + (1 << 29) + (1 << 31), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_FROR", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 29) + (1 << 30) + (1 << 31), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_FRORS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 9) + (1 << 29) + (1 << 30) + (1 << 31), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}N_FROR", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}N_FRORS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31),
         op + (1 << 9) + (1 << 19) + (1 << 29) + (1 << 30) + (1 << 31), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
     ]
 
@@ -798,129 +901,129 @@ def build_tla2(tla, op, field18, field19):
     return [
         (f"E_COND_{tla}", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (7 << 29),
         op + (field18 << 18) + (field19 << 19), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}S", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (7 << 29),
         op + (1 << 9) + (field18 << 18) + (field19 << 19), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_AND", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (7 << 29),
         op + (field18 << 18) + (field19 << 19) + (1 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_ANDS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (7 << 29),
         op + (1 << 9) + (field18 << 18) + (field19 << 19) + (1 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_OR", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (7 << 29),
         op + (field18 << 18) + (field19 << 19) + (2 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_ORS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (7 << 29),
         op + (1 << 9) + (field18 << 18) + (field19 << 19) + (2 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_XOR", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (7 << 29),
         op + (field18 << 18) + (field19 << 19) + (3 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_XORS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (7 << 29),
         op + (1 << 9) + (field18 << 18) + (field19 << 19) + (3 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_ADD", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (7 << 29),
         op + (field18 << 18) + (field19 << 19) + (4 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_ADDS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (7 << 29),
         op + (1 << 9) + (field18 << 18) + (field19 << 19) + (4 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_SUB", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (7 << 29),
         op + (field18 << 18) + (field19 << 19) + (5 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_SUBS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (7 << 29),
         op + (1 << 9) + (field18 << 18) + (field19 << 19) + (5 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_ADC", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (7 << 29),
         op + (field18 << 18) + (field19 << 19) + (6 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_ADCS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (7 << 29),
         op + (1 << 9) + (field18 << 18) + (field19 << 19) + (6 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_SBC", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (7 << 29),
         op + (field18 << 18) + (field19 << 19) + (7 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
         (f"E_COND_{tla}_SBCS", OPMASK + (1 << 9) + (1 << 18) + (1 << 19) + (7 << 29),
         op + (1 << 9) + (field18 << 18) + (field19 << 19) + (7 << 29), [
-            lambda x: COND[(x >> 5) & 0xF],
-            lambda x: REG[(x >> 10) & 0xF],
-            lambda x: REG[(x >> 14) & 0xF],
-            lambda x: REG[(x >> 20) & 0xF],
-            lambda x: (x >> 24) & 0x1F,
+            cond(5),
+            reg(10),
+            reg(14),
+            reg(20),
+            uint(bits(24, 0x1F)),
         ]),
     ]
 
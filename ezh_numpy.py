@@ -0,0 +1,168 @@
+# Optional NumPy decode engine for whole EZH images (ezhdis.py -n)
+# Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import numpy as np
+import ezh_isa
+import ezh_common
+
+def bit_runs(mask):
+    # (shift, width) of each run of consecutive set bits, lowest first
+    runs = []
+    bit = 0
+    while mask >> bit:
+        if mask >> bit & 1:
+            width = 0
+            while mask >> (bit + width) & 1:
+                width += 1
+            runs.append((bit, width))
+            bit += width
+        else:
+            bit += 1
+    return runs
+
+def compact(words, runs):
+    # Pack the bits selected by runs into a dense index
+    index = np.zeros(len(words), dtype=np.uint32)
+    offset = 0
+    for (shift, width) in runs:
+        index |= (words >> np.uint32(shift) & np.uint32((1 << width) - 1)) << np.uint32(offset)
+        offset += width
+    return index
+
+def match_tables(inst):
+    # Entries grouped by codemask, each mapping the compacted masked bits of a
+    # word straight to an INST index, or -1; a table only tests a few bits, so
+    # the groups stay small
+    groups = {}
+    for (index, (mnemonic, codemask, code, fields)) in enumerate(inst):
+        groups.setdefault(codemask, []).append((code, index))
+    tables = []
+    for (codemask, entries) in groups.items():
+        runs = bit_runs(codemask)
+        table = np.full(1 << bin(codemask).count("1"), -1, dtype=np.int16)
+        codes = compact(np.array([code for (code, index) in entries], dtype=np.uint32), runs)
+        table[codes] = [index for (code, index) in entries]
+        tables.append((runs, table))
+    return tables
+
+TABLES = match_tables(ezh_isa.INST)
+
+def as_array(words):
+    # Accepts a uint32 array or a bytes-like little-endian image
+    return words if isinstance(words, np.ndarray) else np.frombuffer(words, dtype="<u4")
+
+def classify(words):
+    # INST index of every word, or -1 if it matches nothing; ezh_compile has
+    # proven the entries disjoint, so at most one group can hit
+    words = as_array(words).astype(np.uint32)
+    ids = np.full(len(words), -1, dtype=np.int16)
+    for (runs, table) in TABLES:
+        np.maximum(ids, table[compact(words, runs)], out=ids)
+    return ids
+
+def field_groups(inst):
+    # For each operand position, the distinct field specs used there and, per
+    # INST index, which one applies (-1 for none; the extra last slot serves
+    # the -1 of unknown words)
+    groups = []
+    for j in range(max(len(fields) for (_, _, _, fields) in inst)):
+        specs = []
+        which = np.full(len(inst) + 1, -1, dtype=np.int16)
+        for (index, (_, _, _, fields)) in enumerate(inst):
+            if j < len(fields):
+                if fields[j] not in specs:
+                    specs.append(fields[j])
+                which[index] = specs.index(fields[j])
+        groups.append((specs, which))
+    return groups
+
+FIELDS = field_groups(ezh_isa.INST)
+
+def field_array(words, field):
+    # ezh_isa.raw_value over a uint32 array
+    value = np.zeros(len(words), dtype=np.int64)
+    for (shift, mask) in field.parts:
+        value += words >> np.uint32(shift) & np.uint32(mask)
+    if field.kind == "sint":
+        sign = 1 << (ezh_isa.field_width(field) - 1)
+        value = (value ^ sign) - sign
+    return value
+
+def decode(words):
+    # Returns (ids, values): values[k, j] is the raw value of operand j of word
+    # k (REG/COND index, immediate, address, ...), or 0 past its last operand;
+    # ezh_isa.operand turns one into its listing form
+    words = as_array(words).astype(np.uint32)
+    ids = classify(words)
+    values = np.zeros((len(words), len(FIELDS)), dtype=np.int64)
+    for (j, (specs, which)) in enumerate(FIELDS):
+        spec_ids = which[ids]
+        for (s, field) in enumerate(specs):
+            sel = np.flatnonzero(spec_ids == s)
+            if len(sel):
+                values[sel, j] = field_array(words[sel], field)
+    return (ids, values)
+
+def disassemble(dis, buffer, load_addr=None):
+    # Same records as dis.disassemble(buffer, load_addr), with the code words
+    # classified and rendered in bulk
+    view = memoryview(buffer).cast("B")
+    whole = len(view) & ~0x3
+    words = np.frombuffer(view[:whole], dtype="<u4")
+    if len(words) < dis.num_apis:
+        raise ValueError("Image has only %d words; too short for API table" % len(words))
+    return records(dis, words, bytes(view[whole:]), dis.load_addr if load_addr == None else load_addr)
+
+def records(dis, words, tail, addr):
+    api_words = words[:dis.num_apis].tolist()
+    for (i, x) in enumerate(api_words):
+        target = x & 0x00FFFFFF
+        yield ezh_common.Instruction(addr, x, ezh_common.API, "DCD", (target,), "DCD 0x%08X" % (x if dis.exact else target), "API %d" % i)
+        addr += 4
+    code = words[dis.num_apis:]
+    (distinct, inverse) = np.unique(code, return_inverse=True)
+    render = dis.render_decoded
+    rendered = [render(x, index) for (x, index) in zip(distinct.tolist(), classify(distinct).tolist())]
+    for (x, k) in zip(code.tolist(), inverse.tolist()):
+        r = rendered[k]
+        if r == None:
+            yield ezh_common.Instruction(addr, x, ezh_common.UNKNOWN, None, (), "DCD 0x%08X" % x if dis.exact else "E_NOP", "Unknown instruction")
+        elif r[3] and dis.exact:
+            comment = "0x%08X %s with spare bits 0x%08X" % (addr, r[2], r[3])
+            yield ezh_common.Instruction(addr, x, ezh_common.INST, r[0], r[1], "DCD 0x%08X" % x, comment)
+        else:
+            yield ezh_common.Instruction(addr, x, ezh_common.INST, r[0], r[1], r[2], "0x%08X" % addr)
+        addr += 4
+    if tail:
+        text = "DCB " + ", ".join("0x%02X" % byte for byte in tail)
+        yield ezh_common.Instruction(addr, int.from_bytes(tail, "little"), ezh_common.PARTIAL, "DCB", tuple(tail), text, "Partial word at " + "0x%08X" % addr)
+
+if __name__ == "__main__":
+    # Benchmark against the scalar decoder on a synthetic image
+    import sys
+    import time
+    import random
+    import ezhdis
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    random.seed(0)
+    image = np.array([random.getrandbits(32) for _ in range(n)], dtype="<u4")
+    word_list = image.tolist()
+    decode_word = ezh_common.decoder()
+    start = time.perf_counter()
+    scalar_ids = [decode_word(x) for x in word_list]
+    scalar_time = time.perf_counter() - start
+    start = time.perf_counter()
+    vector_ids = classify(image)
+    vector_time = time.perf_counter() - start
+    assert vector_ids.tolist() == scalar_ids
+    print("classify %d words: scalar %.3f s, numpy %.3f s (%.1fx)" % (n, scalar_time, vector_time, scalar_time / vector_time))
+    dis = ezhdis.Disassembler()
+    start = time.perf_counter()
+    scalar_lines = [ezh_common.listing_line(inst) for inst in ezhdis.Disassembler().disassemble(image.tobytes())]
+    scalar_time = time.perf_counter() - start
+    start = time.perf_counter()
+    vector_lines = [ezh_common.listing_line(inst) for inst in disassemble(dis, image.tobytes())]
+    vector_time = time.perf_counter() - start
+    assert vector_lines == scalar_lines
+    print("listing %d words: scalar %.3f s, numpy %.3f s (%.1fx)" % (n, scalar_time, vector_time, scalar_time / vector_time))
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+
+# ISA tables derived from the E_* macros of an SDK's fsl_smartdma_prv.h, as
+# an alternative to the hand-written ones in ezh_isa.py (ezhdis.py -I)
+# Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import os
+import re
+import sys
+import marshal
+import ezh_isa
+import ezh_compile
+import ezh_csrc
+
+M = 0xFFFFFFFF
+
+COMMENT = re.compile(r"/\*.*?\*/|//[^\n]*", re.S)
+DEFINE = re.compile(r"^[ \t]*#[ \t]*define[ \t]+(\w+)[ \t]*(\([\w \t,]*\))?[ \t]*(.*)$", re.M)
+TOKEN = re.compile(r"\s*(?:(0[xX][0-9a-fA-F]+|\d+)[uUlL]*|([A-Za-z_]\w*)|(<<|>>|[-+&|^~()]))")
+
+# Operand kinds and widths follow the header's parameter names: cond; dest,
+# src1, rdata, offset and so on are registers; a21 and addr20 are word-aligned
+# addresses, x24 a 24-bit hex value, imm12s a signed 12-bit immediate and
+# andmask a byte
+PARAM_KINDS = [
+    (re.compile(r"cond$"), "cond"),
+    (re.compile(r"(dest|source|src\d|table|offset|r\d*[a-z]+)$"), "reg"),
+    (re.compile(r"(a|addr)\d+$"), "addr"),
+    (re.compile(r"x\d+$"), "hex32"),
+    (re.compile(r"\w*mask$"), "hex8"),
+    (re.compile(r"\w*\d+s$"), "sint"),
+]
+WIDTHS = {"cond": 4, "reg": 4, "hex8": 8}
+DIGITS = re.compile(r"\d+")
+
+class Isa:
+    # Stands in for the ezh_isa module: INST comes from the header, the rest
+    # (register and condition names, peripheral registers) from ezh_isa.
+    # skipped lists (mnemonic, reason) for the E_* macros left out of INST.
+
+    def __init__(self, path, inst, skipped):
+        self.__file__ = path
+        self.INST = inst
+        self.skipped = skipped
+        self.REG = ezh_isa.REG
+        self.COND = ezh_isa.COND
+        self.PERIPH_REGS = ezh_isa.PERIPH_REGS
+        self.Addr = ezh_isa.Addr
+        self.hex32 = ezh_isa.hex32
+        self.code = None
+
+    def compiled(self):
+        # (decode, extract, raw), as ezh_compile.compile_isa
+        if self.code == None:
+            self.code = ezh_compile.compile_isa_code(self.INST)
+        namespace = ezh_compile.isa_namespace(self, self.code)
+        return (namespace["decode"], namespace["EXTRACT"], namespace["RAW"])
+
+    def __getstate__(self):
+        # Code objects don't pickle; a batch worker recompiles or reloads
+        state = dict(self.__dict__)
+        state["code"] = None
+        return state
+
+def param_kind(name):
+    # (kind, width, lowest bit) for a macro parameter
+    kind = "uint"
+    for (pattern, k) in PARAM_KINDS:
+        if pattern.match(name):
+            kind = k
+            break
+    digits = DIGITS.search(name)
+    width = WIDTHS.get(kind, int(digits.group()) if digits else 32)
+    return (kind, width, 2 if kind == "addr" else 0)
+
+def read_macros(text):
+    # Returns ({name: value} for the integer constants, [(name, params, body)]
+    # for the E_* macros. Some macros have a space before their parameter
+    # list, which makes them constants to a C preprocessor; they are taken to
+    # mean what they evidently do.
+    text = COMMENT.sub(" ", text.replace("\\\n", " "))
+    constants = {}
+    macros = []
+    for (name, params, body) in DEFINE.findall(text):
+        body = body.strip()
+        if name.startswith("E_"):
+            params = [p.strip() for p in params[1:-1].split(",") if p.strip()] if params else []
+            macros.append((name, params, body))
+        elif not params:
+            try:
+                constants[name] = ezh_csrc.c_int(body)
+            except ValueError:
+                pass
+    return (constants, macros)
+
+def tokens(params, body, constants):
+    # The expression of a DCD macro body as Python tokens, parameter i as pi
+    # and constants by value; raises ValueError for a body that isn't DCD of
+    # an integer expression
+    if not body.startswith("DCD "):
+        raise ValueError("not a DCD")
+    expr = []
+    pos = 4
+    body = body.rstrip()
+    while pos < len(body):
+        m = TOKEN.match(body, pos)
+        if not m:
+            raise ValueError("can't parse " + repr(body[pos:pos + 16]))
+        (number, name, op) = m.groups()
+        if number != None:
+            expr.append(str(ezh_csrc.c_int(number)))
+        elif name != None:
+            if name in params:
+                expr.append("p%d" % params.index(name))
+            elif name in constants:
+                expr.append(str(constants[name]))
+            else:
+                raise ValueError("unknown name " + name)
+        else:
+            expr.append(op)
+        pos = m.end()
+    return expr
+
+def evaluate(expr, params=()):
+    # A Python function of params for a list of tokens
+    source = "lambda %s: (%s) & 0x%X" % (", ".join("p%d" % i for i in range(len(params))), " ".join(expr), M)
+    try:
+        fn = eval(source, {"__builtins__": {}})
+        fn(*[0] * len(params))
+    except (SyntaxError, TypeError):
+        raise ValueError("bad expression")
+    return fn
+
+def macro_function(params, body, constants):
+    # The word a macro body gives as a Python function of its parameters;
+    # raises ValueError for a body that isn't DCD of an integer expression
+    return evaluate(tokens(params, body, constants), params)
+
+def split(expr, op):
+    # expr split at the op tokens outside parentheses
+    parts = [[]]
+    depth = 0
+    for token in expr:
+        depth += (token == "(") - (token == ")")
+        if token == op and depth == 0:
+            parts.append([])
+        else:
+            parts[-1].append(token)
+    return parts
+
+def enclosed(expr):
+    # True if expr is one parenthesized expression
+    depth = 0
+    for (i, token) in enumerate(expr):
+        depth += (token == "(") - (token == ")")
+        if depth == 0:
+            return token == ")" and i == len(expr) - 1
+    return False
+
+def constant_bits(params, body, constants):
+    # Bits the constant terms of a macro body spell out: the opcode, and each
+    # (value << shift) over the bits value takes up (one for a 0 flag). The
+    # hand-written tables test only these, leaving bits no term names as
+    # don't-care.
+    bits = 0
+    for term in split(tokens(params, body, constants), "+"):
+        if not term or any(token.startswith("p") for token in term):
+            continue
+        while enclosed(term):
+            term = term[1:-1]
+        shifted = split(term, "<<")
+        if len(shifted) == 2:
+            (value, shift) = (evaluate(shifted[0])(), evaluate(shifted[1])())
+            bits |= ((1 << max(1, value.bit_length())) - 1) << shift
+        else:
+            bits |= 0xFF | evaluate(term)()
+    return bits & M
+
+def layout(params, fn):
+    # Returns (codemask, code, fields) by setting one parameter bit at a time.
+    # A parameter's field is its run of low bits that each set one word bit
+    # no other field has (or several, of which the rest are copies and left
+    # out of the codemask), up to the width its name implies. Raises
+    # ValueError if that can't be read back as an ezh_isa.Field.
+    n = len(params)
+    base = fn(*[0] * n)
+    taken = 0
+    copies = 0
+    fields = []
+    for (i, name) in enumerate(params):
+        (kind, width, lowest) = param_kind(name)
+        parts = {}
+        count = 0
+        for k in range(lowest, 32):
+            if count == width:
+                break
+            args = [0] * n
+            args[i] = 1 << k
+            word = fn(*args)
+            d = word ^ base
+            if d == 0:
+                if count:
+                    break
+                continue
+            low = d & -d
+            if word != base | d or low & taken:
+                break
+            shift = low.bit_length() - 1 - k
+            if shift < 0:
+                raise ValueError("%s moves down in the word" % name)
+            parts[shift] = parts.get(shift, 0) | (1 << k)
+            taken |= low
+            copies |= d & ~low
+            count += 1
+        if not parts:
+            raise ValueError("%s sets no bits" % name)
+        fields.append(ezh_isa.Field(kind, tuple(ezh_isa.bits(shift, mask) for (shift, mask) in sorted(parts.items()))))
+    codemask = ~(taken | copies) & M
+    return (codemask, base & codemask, fields)
+
+def subsumes(a, b):
+    # True if every word of entry b also matches entry a
+    (_, codemask_a, code_a, _) = a
+    (_, codemask_b, code_b, _) = b
+    return codemask_a & ~codemask_b == 0 and (code_a ^ code_b) & codemask_a == 0
+
+def build_inst(text):
+    # Returns (INST, skipped) for the text of a header. Macros that only give
+    # some of the words of another (E_GOTO of E_COND_GOTO, E_PUSH of
+    # E_COND_STR_POST, ...) are left out, so INST is pairwise disjoint unless
+    # the header itself is ambiguous. Like the hand-written tables, an entry
+    # then only tests the bits that the macros of its opcode spell out as
+    # constants; the rest are don't-care. Where ezh_isa reads an operand from
+    # some of the bits the header gives it (E_GOSUB's address leaves out bit
+    # 2, the ACC_VECTORED_HOLD table is a register), its reading is kept.
+    hand = {mnemonic: fields for (mnemonic, _, _, fields) in ezh_isa.INST}
+    (constants, macros) = read_macros(text)
+    entries = []
+    skipped = []
+    named = {}
+    for (name, params, body) in macros:
+        try:
+            (codemask, code, fields) = layout(params, macro_function(params, body, constants))
+            bits = constant_bits(params, body, constants)
+        except ValueError as e:
+            skipped.append((name, str(e)))
+            continue
+        entries.append((name, codemask, code, fields))
+        named[code & ezh_isa.OPMASK] = named.get(code & ezh_isa.OPMASK, 0) | bits
+    inst = []
+    for (i, entry) in enumerate(entries):
+        for (j, other) in enumerate(entries):
+            if i != j and subsumes(other, entry) and (not subsumes(entry, other) or j < i):
+                skipped.append((entry[0], "same as " + other[0] if subsumes(entry, other) else "special case of " + other[0]))
+                break
+        else:
+            (name, codemask, code, fields) = entry
+            codemask &= named[code & ezh_isa.OPMASK]
+            if name in hand and len(hand[name]) == len(fields) and all(
+                    ezh_isa.field_bits(h) & ~ezh_isa.field_bits(f) == 0 for (h, f) in zip(hand[name], fields)):
+                fields = hand[name]
+            inst.append((name, codemask, code & codemask, fields))
+    return (inst, skipped)
+
+# Cached tables are only valid for this generator, the ezh_isa tables it
+# follows and ezh_compile, and for the bytecode format
+SOURCES = (__file__, ezh_isa.__file__, ezh_compile.__file__)
+
+def cache_path(header_bytes):
+    key = ezh_compile.source_key(SOURCES, header_bytes)
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__", "ezh_prv.%s.isa" % key)
+
+def load(path):
+    # Returns the Isa for the header at path, parsed and compiled once per
+    # distinct header and then read back from __pycache__; raises
+    # ezh_compile.IsaError if the header's encodings are ambiguous
+    with open(path, "rb") as fh:
+        header_bytes = fh.read()
+    cache = cache_path(header_bytes)
+    try:
+        with open(cache, "rb") as fh:
+            (inst, skipped, code) = marshal.load(fh)
+        isa = Isa(path, [(m, cm, c, [ezh_isa.Field(k, p) for (k, p) in f]) for (m, cm, c, f) in inst], skipped)
+        isa.code = code
+        return isa
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    (inst, skipped) = build_inst(header_bytes.decode("latin-1"))
+    isa = Isa(path, inst, skipped)
+    isa.code = ezh_compile.compile_isa_code(inst)
+    ezh_compile.write_cache(cache, marshal.dumps(([(m, cm, c, [tuple(f) for f in fields]) for (m, cm, c, fields) in inst], skipped, isa.code)))
+    return isa
+
+def compare(isa):
+    # Lines describing how isa.INST differs from the hand-written ezh_isa.INST
+    lines = []
+    hand = {entry[0]: entry for entry in ezh_isa.INST}
+    derived = {entry[0]: entry for entry in isa.INST}
+    for name in sorted(set(hand) | set(derived)):
+        if name not in derived:
+            lines.append("%s: only in ezh_isa" % name)
+        elif name not in hand:
+            lines.append("%s: only in header" % name)
+        else:
+            (_, codemask_h, code_h, fields_h) = hand[name]
+            (_, codemask_d, code_d, fields_d) = derived[name]
+            if code_h & codemask_h != code_d & codemask_h or codemask_h & ~codemask_d:
+                lines.append("%s: code 0x%08X/0x%08X in ezh_isa, 0x%08X/0x%08X in header" % (name, code_h, codemask_h, code_d, codemask_d))
+            if [(f.kind, sorted(f.parts)) for f in fields_h] != [(f.kind, sorted(f.parts)) for f in fields_d]:
+                lines.append("%s: operands %s in ezh_isa, %s in header" % (name, fields_h, fields_d))
+    return lines
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage:", sys.argv[0], "[-d] fsl_smartdma_prv.h")
+        sys.exit(1)
+    try:
+        isa = load(sys.argv[-1])
+    except ezh_compile.IsaError as e:
+        print(e)
+        sys.exit(1)
+    print(len(isa.INST), "instruction mnemonics from", sys.argv[-1] + ",", len(isa.skipped), "macros left out")
+    for (name, reason) in isa.skipped:
+        if not reason.startswith(("same as", "special case of")):
+            print("Left out", name + ":", reason)
+    if "-d" in sys.argv:
+        for line in compare(isa):
+            print(line)
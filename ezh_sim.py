@@ -0,0 +1,766 @@
+#!/usr/bin/env python3
+
+# Instruction-set simulator for NXP's secret "EZH" microprocessor (aka SmartDMA)
+# Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# The EZH is undocumented, so the semantics here are inferred from the
+# mnemonics, the SDK's fsl_smartdma_prv.h and the code NXP ships:
+# - PC reads as the address of the instruction plus 4
+# - LDR/STR offsets count in units of the access size; _PRE adds the offset
+#   to the pointer before the access and _POST after, both writing it back
+# - the N forms (ADDN, LOAD_SIMMN, ...) invert their second operand
+# - FEND/FBIT byte-reverse/bit-reverse the shifted operand first; the F forms
+#   of the two-operand shifts (ADD_FLSL, ...) are treated as the plain shifts
+# - S forms set Z and N, and C and V for arithmetic (C is "no borrow" for
+#   subtraction); other instructions leave the flags alone
+# - TIGHT_LOOP(rend, rcount) repeats the code from the next instruction up to
+#   and including the one at rend, rcount + 1 times
+# - HOLD and the VECTORED_HOLD family wait for an event from Stubs; a vector
+#   hold then jumps to table + vector * 4 (or * 16 for the LV forms), setting
+#   RA to the hold itself unless NRA. With Stimulus, the event is a change of
+#   a GPI pin selected in CFM.
+# Cycle counts are a model as well: one cycle per instruction, plus one for a
+# taken branch, a memory access or a peripheral access, plus time spent
+# waiting in HOLD and WAIT_FOR_BEAT.
+
+import re
+import heapq
+import array
+import sys
+import time
+import collections
+import ezh_isa
+import ezh_common
+
+M = 0xFFFFFFFF
+
+BRANCH_CYCLES = 1
+MEMORY_CYCLES = 1
+PERIPH_CYCLES = 1
+
+REG = {name: index for (index, name) in ezh_isa.REG.items()}
+PC = REG["PC"]
+GPI = REG["GPI"]
+GPO = REG["GPO"]
+RA = REG["RA"]
+CFM = REG["CFM"]
+
+# Registers kept in Sim.r while a block runs, for the Stubs to see
+SHARED = (GPO, REG["CFS"], CFM)
+
+# Condition codes as expressions over the Sim s
+CONDITIONS = {
+    "EU": "True",
+    "ZE": "s.z",
+    "NZ": "not s.z",
+    "PO": "not s.n",
+    "NE": "s.n",
+    "AZ": "not s.z and not s.n",
+    "ZB": "s.z or s.n",
+    "CA": "s.c",
+    "NC": "not s.c",
+    "CZ": "s.c and not s.z",
+    "SPO": "not s.z and s.n == s.v",
+    "SNE": "s.n != s.v",
+    "NBS": "not s.env.bit_slice(s)",
+    "NEX": "not s.env.external(s)",
+    "BS": "s.env.bit_slice(s)",
+    "EX": "s.env.external(s)",
+}
+
+class SimError(Exception):
+    pass
+
+class Memory:
+    # Flat 32-bit little-endian address space in sparse 4 KiB pages of words;
+    # unwritten memory reads as zero
+
+    def __init__(self):
+        self.pages = {}
+
+    def page(self, addr):
+        page = self.pages.get(addr >> 12)
+        if page == None:
+            page = self.pages[addr >> 12] = array.array("I", bytes(4096))
+        return page
+
+    def load(self, addr, data):
+        for i in range(len(data)):
+            self.write8(addr + i, data[i])
+
+    def read32(self, addr):
+        page = self.pages.get(addr >> 12)
+        return 0 if page == None else page[addr >> 2 & 0x3FF]
+
+    def write32(self, addr, value):
+        self.page(addr)[addr >> 2 & 0x3FF] = value & M
+
+    def read8(self, addr):
+        return self.read32(addr) >> (addr & 0x3) * 8 & 0xFF
+
+    def write8(self, addr, value):
+        page = self.page(addr)
+        shift = (addr & 0x3) * 8
+        page[addr >> 2 & 0x3FF] = page[addr >> 2 & 0x3FF] & ~(0xFF << shift) | (value & 0xFF) << shift
+
+class Stubs:
+    # Peripherals, GPIO and events seen by a Sim; every input is idle by
+    # default. Subclass to model real hardware, e.g. a pixel clock on GPI.
+
+    def __init__(self):
+        self.regs = {}
+        self.interrupts = 0
+        self.first_interrupt = None
+
+    def per_read(self, s, addr):
+        return self.regs.get(addr, 0)
+
+    def per_write(self, s, addr, value):
+        self.regs[addr] = value
+
+    def gpi(self, s):
+        return 0
+
+    def gpo(self, s, value):
+        pass
+
+    def hold(self, s):
+        # Cycles spent waiting for the event a HOLD waits for, or None if it
+        # will never come
+        return 0
+
+    def next_event(self, s):
+        # Cycle of the next change to any input, or None if they never change
+        # again; inputs that change without saying so here can be missed by
+        # loops the Sim skips over
+        return None
+
+    def vector(self, s):
+        # Which vector a VECTORED_HOLD takes
+        return 0
+
+    def bit_slice(self, s):
+        return False
+
+    def external(self, s):
+        return False
+
+    def interrupt(self, s, value):
+        self.interrupts += 1
+        if self.first_interrupt == None:
+            self.first_interrupt = s.cycle
+
+class Stimulus(Stubs):
+    # Stubs driving GPI from a queue of (cycle, value) events; a HOLD waits
+    # for the next event that changes a pin selected in CFM (any pin if CFM
+    # is 0), or forever once there is none
+
+    def __init__(self, events=()):
+        super().__init__()
+        self.queue = list(events)
+        heapq.heapify(self.queue)
+        self.value = 0
+
+    def schedule(self, cycle, value):
+        heapq.heappush(self.queue, (cycle, value))
+
+    def advance(self, cycle):
+        while self.queue and self.queue[0][0] <= cycle:
+            self.value = heapq.heappop(self.queue)[1]
+
+    def gpi(self, s):
+        self.advance(s.cycle)
+        return self.value
+
+    def hold(self, s):
+        self.advance(s.cycle)
+        mask = s.r[CFM] or M
+        while self.queue:
+            (cycle, value) = heapq.heappop(self.queue)
+            changed = (self.value ^ value) & mask
+            self.value = value
+            if changed:
+                return cycle - s.cycle
+        return None
+
+    def next_event(self, s):
+        self.advance(s.cycle)
+        return self.queue[0][0] if self.queue else None
+
+def bswap(x):
+    return int.from_bytes(x.to_bytes(4, "little"), "big")
+
+def bitrev(x):
+    return int("{:032b}".format(x)[::-1], 2)
+
+def shift_expr(kind, value, amount):
+    if amount == 0:
+        return value
+    if kind == "LSL":
+        return "(%s << %d & M)" % (value, amount)
+    if kind == "LSR":
+        return "(%s >> %d)" % (value, amount)
+    if kind == "ASR":
+        return "(((%s ^ 0x80000000) - 0x80000000) >> %d & M)" % (value, amount)
+    return "((%s >> %d | %s << %d) & M)" % (value, amount, value, 32 - amount)
+
+ALU = {
+    # result x from a and b, and the C and V it gives, or None to leave them
+    "ADD": ("a + b", "x >> 32", "(~(a ^ b) & (a ^ x)) >> 31 & 1"),
+    "ADC": ("a + b + s.c", "x >> 32", "(~(a ^ b) & (a ^ x)) >> 31 & 1"),
+    "SUB": ("a - b", "x >= 0", "((a ^ b) & (a ^ x)) >> 31 & 1"),
+    "SBC": ("a - b - 1 + s.c", "x >= 0", "((a ^ b) & (a ^ x)) >> 31 & 1"),
+    "OR": ("a | b", None, None),
+    "AND": ("a & b", None, None),
+    "XOR": ("a ^ b", None, None),
+}
+
+TLA1 = re.compile(r"E_COND_(ADD|SUB|ADC|SBC|OR|AND|XOR)(N?)_(IMM|F?(LSL|LSR|ASR|ROR))(S?)$")
+TLA2 = re.compile(r"E_COND_(?:F(END|BIT)_)?(LSL|LSR|ASR|ROR)(?:_(ADD|SUB|ADC|SBC|OR|AND|XOR))?(S?)$")
+LOAD_STORE = re.compile(r"E_COND_(LDR|STR)(B?S?)(_PRE|_POST)?$")
+BITS = re.compile(r"E_COND_B(TST|CLR|SET|TOG)(_IMM)?(S?)$")
+VECTORED = re.compile(r"E_COND_(ACC_)?VECTORED_HOLD(_LV)?(_NRA)?$")
+
+class Emitter:
+    # Python source for one instruction at pc, to run as part of a block with
+    # the Sim as s, its extra_at as e and the general registers it uses in
+    # locals r0, r1, ... (SHARED ones stay in s.r). c is the cycle
+    # the block started at and before the static cycles of the instructions
+    # ahead of this one in it; cycles known at translation time are summed in
+    # static, the rest added to t and e as they happen.
+
+    def __init__(self, pc, conditional=False, before=0):
+        self.pc = pc
+        self.conditional = conditional
+        self.before = before
+        self.static = 1
+        self.ends = False
+        self.effects = False
+        self.target = None
+        self.lines = []
+        self.regs = set()
+
+    def emit(self, line):
+        self.lines.append(line)
+
+    def cost(self, cycles):
+        if type(cycles) is int and not self.conditional:
+            self.static += cycles
+        elif type(cycles) is int:
+            self.emit("t += %d" % cycles)
+            self.emit("e[0x%X] += %d" % (self.pc, cycles))
+        else:
+            if cycles != "w":
+                self.emit("w = %s" % cycles)
+            self.emit("if w:")
+            self.emit("    t += w")
+            self.emit("    e[0x%X] += w" % self.pc)
+
+    def sync(self):
+        # Brings s.cycle up to date before anything outside the block sees it
+        self.emit("s.cycle = c + %d + t" % self.before)
+
+    def wait(self):
+        # Waits for the event a hold waits for; if it never comes, the block
+        # stops the Sim here, at the hold
+        self.effects = True
+        self.sync()
+        self.emit("w = s.env.hold(s)")
+        self.emit("if w == None:")
+        self.emit("    EXIT")
+        self.cost("w")
+
+    def read(self, reg):
+        if reg == PC:
+            return "0x%X" % (self.pc + 4)
+        if reg == GPI:
+            self.sync()
+            return "s.env.gpi(s)"
+        if reg in SHARED:
+            return "r[%d]" % reg
+        self.regs.add(reg)
+        return "r%d" % reg
+
+    def write(self, reg, value):
+        if reg == None:
+            return
+        if reg == PC:
+            self.jump("(%s) & 0xFFFFFFFC" % value)
+        elif reg == GPO:
+            self.emit("r[%d] = %s" % (reg, value))
+            self.sync()
+            self.emit("s.env.gpo(s, r[%d])" % reg)
+            self.effects = True
+        elif reg in SHARED:
+            self.emit("r[%d] = %s" % (reg, value))
+        elif reg != GPI:
+            self.regs.add(reg)
+            self.emit("r%d = %s" % (reg, value))
+
+    def jump(self, target):
+        self.emit("s.npc = %s" % target)
+        self.cost(BRANCH_CYCLES)
+        self.ends = True
+
+    def flags(self, carry=None, overflow=None):
+        self.emit("s.z = x & M == 0")
+        self.emit("s.n = x >> 31 & 1")
+        if carry != None:
+            self.emit("s.c = int(%s)" % carry)
+            self.emit("s.v = %s" % overflow)
+
+    def alu(self, op, a, b, dest, invert, set_flags):
+        self.emit("a = " + a)
+        self.emit("b = " + ("~%s & M" % b if invert else b))
+        (result, carry, overflow) = ALU[op]
+        self.emit("x = " + result)
+        self.write(dest, "x & M")
+        if set_flags:
+            self.flags(carry, overflow)
+
+    def instruction(self, mnemonic, ops):
+        # ops are the raw operand values (ezh_isa.raw_value), condition first
+        # for the E_COND_ forms. Results go to dest, which is None for the
+        # instructions ezh_isa.NO_DEST says don't write their second operand.
+        dest = ops[1] if len(ops) > 1 and 1 in ezh_isa.written_operands(mnemonic) else None
+        m = TLA1.match(mnemonic)
+        if m:
+            (op, invert, form, kind, set_flags) = m.groups()
+            if form == "IMM":
+                b = "0x%X" % (ops[3] & M)
+            else:
+                b = shift_expr(kind, self.read(ops[3]), ops[4])
+            return self.alu(op, self.read(ops[2]), b, dest, invert, set_flags)
+        m = TLA2.match(mnemonic)
+        if m:
+            (flip, kind, op, set_flags) = m.groups()
+            source = ops[3] if op else ops[2]
+            value = self.read(source)
+            if flip:
+                value = ("bswap(%s)" if flip == "END" else "bitrev(%s)") % value
+            b = shift_expr(kind, value, ops[-1])
+            if op:
+                return self.alu(op, self.read(ops[2]), b, dest, False, set_flags)
+            self.emit("x = " + b)
+            self.write(dest, "x")
+            if set_flags:
+                self.flags()
+            return
+        m = LOAD_STORE.match(mnemonic)
+        if m:
+            return self.load_store(*m.groups(), ops)
+        m = BITS.match(mnemonic)
+        if m:
+            (op, imm, set_flags) = m.groups()
+            bit = "%d" % (ops[3] & 31) if imm else "(%s & 31)" % self.read(ops[3])
+            x = {"TST": "a & 1 << %s", "CLR": "a & ~(1 << %s) & M", "SET": "a | 1 << %s", "TOG": "a ^ 1 << %s"}[op]
+            self.emit("a = " + self.read(ops[2]))
+            self.emit("x = " + x % bit)
+            self.write(dest, "x")
+            if set_flags:
+                self.flags()
+            return
+        m = VECTORED.match(mnemonic)
+        if m:
+            (acc, large, no_ra) = m.groups()
+            self.wait()
+            self.sync()
+            table = self.read(ops[1])
+            if not no_ra:
+                self.write(RA, "0x%X" % self.pc)
+            self.jump("(%s + s.env.vector(s) * %d) & 0xFFFFFFFC" % (table, 16 if large else 4))
+            return
+        if mnemonic in ("E_COND_MOV", "E_COND_MOVS", "E_COND_MVN", "E_COND_MVNS"):
+            self.emit("x = " + ("~%s & M" if "MVN" in mnemonic else "%s") % self.read(ops[2]))
+            self.write(dest, "x")
+            if mnemonic.endswith("S"):
+                self.flags()
+            return
+        if mnemonic.startswith("E_COND_LOAD_SIMM"):
+            value = (ops[2] << ops[3]) & M
+            if "SIMMN" in mnemonic:
+                value = ~value & M
+            self.emit("x = 0x%X" % value)
+            self.write(dest, "x")
+            if mnemonic.endswith("S"):
+                self.flags()
+            return
+        if mnemonic == "E_COND_PER_READ":
+            self.cost(PERIPH_CYCLES)
+            self.sync()
+            self.write(dest, "s.env.per_read(s, 0x%X)" % ops[2])
+            return
+        if mnemonic == "E_COND_PER_WRITE":
+            self.cost(PERIPH_CYCLES)
+            self.sync()
+            self.effects = True
+            self.emit("s.env.per_write(s, 0x%X, %s)" % (ops[2], self.read(ops[1])))
+            return
+        if mnemonic in ("E_COND_GOTO", "E_COND_GOTOL", "E_GOSUB"):
+            target = ops[-1]
+            if mnemonic != "E_COND_GOTO":
+                self.write(RA, "0x%X" % (self.pc + 4))
+            elif target == self.pc and ops[0] == 0:
+                # Spins here forever
+                self.emit("s.stop = 'halt'")
+            self.jump("0x%X" % target)
+            self.target = target
+            return
+        if mnemonic in ("E_COND_GOTO_REG", "E_COND_GOTO_REGL"):
+            self.emit("a = " + self.read(ops[1]))
+            if mnemonic.endswith("L"):
+                self.write(RA, "0x%X" % (self.pc + 4))
+            self.jump("a & 0xFFFFFFFC")
+            return
+        if mnemonic == "E_COND_TIGHT_LOOP":
+            self.emit("s.loop_start = 0x%X" % (self.pc + 4))
+            self.emit("s.loop_end = " + self.read(ops[1]))
+            self.emit("s.loop_count = " + self.read(ops[2]))
+            self.ends = True
+            self.effects = True
+            return
+        if mnemonic == "E_COND_HOLD":
+            self.wait()
+            return
+        if mnemonic == "E_INT_TRIGGER":
+            self.sync()
+            self.effects = True
+            self.emit("s.env.interrupt(s, 0x%X)" % ops[0])
+            return
+        if mnemonic == "E_MODIFY_GPO_BYTE":
+            (and_mask, or_mask, xor_mask) = ops
+            self.write(GPO, "r[%d] & ~0xFF | ((r[%d] & 0x%X | 0x%X) ^ 0x%X) & 0xFF" % (GPO, GPO, and_mask, or_mask, xor_mask))
+            return
+        if mnemonic.startswith(("E_HEART_RYTHM", "E_SYNCH_ALL_TO_BEAT", "E_WAIT_FOR_BEAT")):
+            self.effects = True
+        if mnemonic == "E_HEART_RYTHM_IMM":
+            self.emit("s.beat_period = %d" % ops[0])
+            return
+        if mnemonic == "E_HEART_RYTHM":
+            self.emit("s.beat_period = %s & 0xFFFF" % self.read(ops[0]))
+            return
+        if mnemonic == "E_SYNCH_ALL_TO_BEAT":
+            self.sync()
+            self.emit("s.beat_start = s.cycle")
+            return
+        if mnemonic == "E_WAIT_FOR_BEAT":
+            self.sync()
+            self.cost("s.beat_wait()")
+            return
+        if mnemonic == "E_NOP":
+            return
+        raise SimError("No semantics for " + mnemonic)
+
+    def load_store(self, op, size, mode, ops):
+        # LDR(cond, dest, pointer, offset) and STR(cond, pointer, data, offset)
+        (pointer, data) = (ops[2], ops[1]) if op == "LDR" else (ops[1], ops[2])
+        step = ops[3] * (1 if size else 4)
+        self.cost(MEMORY_CYCLES)
+        self.emit("p = " + self.read(pointer))
+        if mode == "_POST":
+            self.emit("addr = p")
+        else:
+            self.emit("addr = (p + %d) & M" % step)
+        if op == "LDR":
+            if not size:
+                self.emit("x = mem.read32(addr)")
+            elif size == "B":
+                self.emit("x = mem.read8(addr)")
+            else:
+                self.emit("x = (mem.read8(addr) ^ 0x80) - 0x80 & M")
+        else:
+            # Ends the block, in case it stores into it
+            self.emit("s.store(addr, %s, %d)" % (self.read(data), 1 if size else 4))
+            self.ends = True
+            self.effects = True
+        if mode:
+            self.write(pointer, "(p + %d) & M" % step)
+        if op == "LDR":
+            self.write(data, "x")
+
+def emit_instruction(pc, mnemonic, ops, has_cond, before=0):
+    # The Emitter for one instruction, its lines wrapped in its condition
+    emitter = Emitter(pc, has_cond and ops[0] != 0, before)
+    emitter.instruction(mnemonic, ops)
+    if emitter.conditional:
+        cond = CONDITIONS[ezh_isa.COND[ops[0]]]
+        lines = ["if %s:" % cond] + ["    " + line for line in emitter.lines or ["pass"]]
+        if "s.env" in cond:
+            emitter.lines = []
+            emitter.sync()
+            lines = emitter.lines + lines
+        emitter.lines = lines
+    return emitter
+
+def emit_block(name, emitters):
+    # Source of name(s), running the instructions and updating s.cycle. If a
+    # hold stops the Sim, it returns how many instructions ran before it.
+    regs = sorted(set().union(*[emitter.regs for emitter in emitters]))
+    load = [", ".join("r%d" % i for i in regs) + " = " + ", ".join("r[%d]" % i for i in regs)] if regs else []
+    store = [", ".join("r[%d]" % i for i in regs) + " = " + ", ".join("r%d" % i for i in regs)] if regs else []
+    lines = ["def %s(s):" % name, "    r = s.r", "    e = s.extra_at", "    mem = s.mem", "    c = s.cycle", "    t = 0"]
+    lines += ["    " + line for line in load]
+    for (i, emitter) in enumerate(emitters):
+        for line in emitter.lines:
+            if line.strip() == "EXIT":
+                indent = "    " + line[:-len("EXIT")]
+                exit = store + ["s.npc = 0x%X" % emitter.pc, "s.stop = 'idle'", "return %d" % i]
+                lines += [indent + line for line in exit]
+            else:
+                lines.append("    " + line)
+    lines += ["    " + line for line in store]
+    lines.append("    s.cycle = c + %d + t" % sum(emitter.static for emitter in emitters))
+    return "\n".join(lines) + "\n"
+
+NAMESPACE = {"M": M, "bswap": bswap, "bitrev": bitrev}
+
+# Longest run of instructions translated as one block
+MAX_BLOCK = 64
+
+class Block:
+    # Straight-line code from start up to end (exclusive), translated to fn;
+    # static is [(address, cycles), ...] for the cycles known at translation
+    # time, and runs counts calls of fn. A pure block has no effects outside
+    # the registers and flags; target is where its last instruction jumps, if
+    # that is known.
+
+    __slots__ = ("start", "end", "length", "fn", "static", "runs", "pure", "target")
+
+    def __init__(self, start, end, fn, static, pure=False, target=None):
+        self.start = start
+        self.end = end
+        self.length = len(static)
+        self.fn = fn
+        self.static = static
+        self.runs = 0
+        self.pure = pure
+        self.target = target
+
+class Sim:
+    # Runs an image with its registers, flags and a flat memory. Code is
+    # translated to Python a basic block at a time, the blocks cached by start
+    # address and dropped when something is stored into them. Without
+    # fast_forward, idle loops run every trip.
+
+    def __init__(self, image, load_addr=0x00100000, num_apis=0, env=None, fast_forward=True):
+        (self.decode, _, self.raw) = ezh_common.compiled_isa()
+        self.load_addr = load_addr
+        self.num_apis = num_apis
+        self.mem = Memory()
+        self.mem.load(load_addr, image)
+        self.env = env if env != None else Stubs()
+        self.fast_forward = fast_forward
+        # Blocks by start address, or (start, stop) for those cut short at the
+        # end of a TIGHT_LOOP; covers maps each translated word to the keys of
+        # the blocks holding it
+        self.blocks = {}
+        self.covers = {}
+        self.retired = []
+        self.reset(load_addr + 4 * num_apis)
+
+    def reset(self, pc):
+        self.r = [0] * 16
+        self.z = self.n = self.c = self.v = 0
+        self.pc = pc
+        self.npc = pc
+        self.cycle = 0
+        self.count = 0
+        self.extra_at = collections.Counter()
+        for block in self.blocks.values():
+            block.runs = 0
+        self.retired = []
+        self.loop_start = self.loop_end = None
+        self.loop_count = 0
+        self.beat_period = 0
+        self.beat_start = 0
+        self.stop = None
+
+    def api_entry(self, i):
+        return self.mem.read32(self.load_addr + 4 * i) & 0x00FFFFFF
+
+    def beat_wait(self):
+        if self.beat_period == 0:
+            return 0
+        return -(self.cycle - self.beat_start) % self.beat_period
+
+    def store(self, addr, value, size):
+        if size == 4:
+            self.mem.write32(addr, value)
+        else:
+            self.mem.write8(addr, value)
+        for key in self.covers.pop(addr & 0xFFFFFFFC, ()):
+            block = self.blocks.pop(key, None)
+            if block != None:
+                self.retired.append(block)
+
+    def cycles_at(self):
+        # Counter of the cycles spent at each address
+        counts = collections.Counter(self.extra_at)
+        for block in list(self.blocks.values()) + self.retired:
+            if block.runs:
+                for (pc, cycles) in block.static:
+                    counts[pc] += block.runs * cycles
+        return counts
+
+    def translate(self, start, stop=None):
+        # Translates the block at start, ending at the first transfer of
+        # control, store or TIGHT_LOOP, or at the instruction at stop
+        emitters = []
+        before = 0
+        pc = start
+        while len(emitters) < MAX_BLOCK:
+            word = self.mem.read32(pc)
+            index = self.decode(word)
+            if index < 0:
+                if pc == start:
+                    raise SimError("Unknown instruction 0x%08X at 0x%08X" % (word, pc))
+                break
+            (mnemonic, _, _, fields) = ezh_isa.INST[index]
+            has_cond = bool(fields) and fields[0].kind == "cond"
+            emitter = emit_instruction(pc, mnemonic, self.raw[index](word), has_cond, before)
+            emitters.append(emitter)
+            before += emitter.static
+            pc += 4
+            if emitter.ends or pc - 4 == stop:
+                break
+        namespace = dict(NAMESPACE)
+        exec(emit_block("block_%08X" % start, emitters), namespace)
+        block = Block(start, pc, namespace["block_%08X" % start], [(e.pc, e.static) for e in emitters],
+            not any(e.effects for e in emitters), emitters[-1].target)
+        key = start if stop == None else (start, stop)
+        self.blocks[key] = block
+        for e in emitters:
+            self.covers.setdefault(e.pc, []).append(key)
+        return block
+
+    def run(self, max_cycles):
+        # Runs until max_cycles have passed or something stops the machine;
+        # returns why it stopped. Blocks run whole, so it may overshoot by one.
+        blocks = self.blocks
+        self.limit = limit = self.cycle + max_cycles
+        while self.cycle < limit:
+            pc = self.pc
+            block = blocks.get(pc)
+            if block == None:
+                block = self.translate(pc)
+            loop_end = self.loop_end
+            if loop_end != None and pc <= loop_end < block.end - 4:
+                block = blocks.get((pc, loop_end)) or self.translate(pc, loop_end)
+            end = block.end
+            # A pure block that can come straight back to its start might be
+            # idling, so note the state it starts in and the next input change
+            # it could see
+            spin = self.fast_forward and block.pure and (block.target == pc or (end - 4 == loop_end and pc == self.loop_start))
+            if spin:
+                before = (self.r[:], self.z, self.n, self.c, self.v, self.cycle, [self.extra_at[a] for (a, _) in block.static],
+                    self.env.next_event(self))
+            self.npc = end
+            n = block.fn(self)
+            if n != None:
+                # Stopped before its instruction n
+                self.count += n
+                for (a, cycles) in block.static[:n]:
+                    self.extra_at[a] += cycles
+                self.pc = self.npc
+                return self.stop
+            block.runs += 1
+            self.count += block.length
+            looped = False
+            if end - 4 == self.loop_end and self.npc == end:
+                if self.loop_count:
+                    self.loop_count -= 1
+                    self.npc = self.loop_start
+                    looped = True
+                else:
+                    self.loop_end = None
+            self.pc = self.npc
+            if spin and pc == self.pc and (self.r, self.z, self.n, self.c, self.v) == before[:5]:
+                self.skip(block, looped, before)
+            if self.stop:
+                return self.stop
+        return "cycle limit"
+
+    def skip(self, block, looped, before):
+        # block came back to its start with nothing changed, so it goes round
+        # the same way until an input changes: skip ahead to the last time
+        # round before the next event, the cycle limit or the end of the
+        # TIGHT_LOOP, as if each had run. An input that changed during the
+        # trip just run may not have been read yet, so then it isn't skipped.
+        period = self.cycle - before[5]
+        event = before[7]
+        if event != None and event <= self.cycle:
+            return
+        if event == None and not looped:
+            # A GOTO to itself has already said it halts
+            if self.stop == None:
+                self.stop = "idle"
+            return
+        k = -(-(self.limit - self.cycle) // period)
+        if event != None:
+            k = min(k, (event - self.cycle) // period)
+        if looped:
+            k = min(k, self.loop_count)
+            self.loop_count -= k
+        self.cycle += k * period
+        self.count += k * block.length
+        block.runs += k
+        for ((a, _), extra) in zip(block.static, before[6]):
+            if self.extra_at[a] != extra:
+                self.extra_at[a] += k * (self.extra_at[a] - extra)
+
+def main(argv):
+    if len(argv) < 2:
+        print("Usage:", argv[0], "[-l load_addr] [-a num_apis] [-e api] [-n max_cycles] [-i stimulus.txt] image.bin")
+        sys.exit(1)
+    load_addr = int(argv[argv.index("-l") + 1], 0) if "-l" in argv else 0x00100000
+    num_apis = int(argv[argv.index("-a") + 1]) if "-a" in argv else 0
+    max_cycles = int(argv[argv.index("-n") + 1], 0) if "-n" in argv else 1000000
+
+    with open(argv[-1], "rb") as fh:
+        image = fh.read()
+
+    # Stimulus: lines of "cycle value" giving the GPI pins from that cycle on
+    events = None
+    if "-i" in argv:
+        events = []
+        with open(argv[argv.index("-i") + 1]) as fh:
+            for line in fh:
+                line = line.split("#")[0].split()
+                if line:
+                    events.append((int(line[0], 0), int(line[1], 0)))
+
+    if "-e" in argv:
+        apis = [int(argv[argv.index("-e") + 1])]
+    else:
+        apis = list(range(num_apis)) or [None]
+
+    # Only to list the busiest instructions; the simulator itself needs no ezhdis
+    import ezhdis
+    dis = ezhdis.Disassembler(load_addr, num_apis)
+    total = 0
+    start = time.perf_counter()
+    for i in apis:
+        env = Stubs() if events == None else Stimulus(events)
+        sim = Sim(image, load_addr, num_apis, env)
+        if i != None:
+            sim.reset(sim.api_entry(i))
+        entry = sim.pc
+        try:
+            reason = sim.run(max_cycles)
+        except SimError as e:
+            reason = str(e)
+        total += sim.count
+        name = "API %d" % i if i != None else "Entry"
+        print("%s at 0x%08X: %d instructions, %d cycles (%s)" % (name, entry, sim.count, sim.cycle, reason))
+        if env.first_interrupt != None:
+            print("    first INT_TRIGGER after %d cycles, %d in all" % (env.first_interrupt, env.interrupts))
+        for (pc, cycles) in sim.cycles_at().most_common(5):
+            rendered = dis.render(sim.mem.read32(pc))
+            print("    0x%08X %-48s %d cycles" % (pc, rendered[2] if rendered else "?", cycles))
+    elapsed = time.perf_counter() - start
+    print()
+    print("%d instructions simulated in %.2f s, %.0f instructions/sec" % (total, elapsed, total / elapsed))
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+
+# Exhaustive sweep of the 32-bit encoding space through the EZH decoder:
+# coverage per opcode, and the words that are ambiguous or undecodable
+# Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import os
+import sys
+import json
+import time
+import collections
+import multiprocessing
+import ezh_isa
+import ezh_compile
+import ezh_common
+
+SHARD_BITS = 24
+OPCODES = ezh_isa.OPMASK + 1
+# A shard strides through its words by opcode, so it must hold every opcode
+MIN_SHARD_BITS = OPCODES.bit_length() - 1
+
+def cube_size(mask):
+    # Number of words x with x & mask equal to some value
+    return 1 << (32 - bin(mask).count("1"))
+
+def ambiguous_cubes(inst):
+    # [mask, value, mnemonics] for the words matched by two entries at once
+    cubes = []
+    for i in range(len(inst)):
+        (mnemonic_i, codemask_i, code_i, _) = inst[i]
+        for j in range(i + 1, len(inst)):
+            (mnemonic_j, codemask_j, code_j, _) = inst[j]
+            if (code_i ^ code_j) & codemask_i & codemask_j == 0:
+                mask = codemask_i | codemask_j
+                cubes.append([mask, (code_i | code_j) & mask, [mnemonic_i, mnemonic_j]])
+    return cubes
+
+def undecodable_cubes(inst):
+    # Disjoint [mask, value] whose words decode to nothing, from the decision
+    # tree: each leaf holds the words with its tested bits, and those that
+    # differ from its entry in an untested bit of the codemask fail
+    cubes = []
+    work = [(ezh_compile.build_tree(inst), 0, 0)]
+    while work:
+        (tree, mask, value) = work.pop()
+        if len(tree) == 3:
+            (bit, zero, one) = tree
+            work.append((zero, mask | 1 << bit, value))
+            work.append((one, mask | 1 << bit, value | 1 << bit))
+            continue
+        (index, untested) = tree
+        if index < 0:
+            cubes.append([mask, value])
+            continue
+        code = inst[index][2]
+        for bit in range(32):
+            if untested & 1 << bit:
+                cubes.append([mask | 1 << bit, value | (~code & 1 << bit)])
+                mask |= 1 << bit
+                value |= code & 1 << bit
+    return sorted(cubes, key=lambda cube: (cube[1] & ezh_isa.OPMASK, cube[1], cube[0]))
+
+def sweep_init(isa, use_numpy):
+    # Runs once per worker process
+    global SWEEP_DECODE, SWEEP_CLASSIFY
+    SWEEP_DECODE = ezh_common.compiled_isa(isa)[0]
+    SWEEP_CLASSIFY = None
+    if use_numpy:
+        import ezh_numpy
+        SWEEP_CLASSIFY = ezh_numpy.classify
+
+def sweep_shard(args):
+    # Returns (shard, [{index: words} per opcode]) for the words of one shard,
+    # index -1 counting the undecodable ones
+    (shard, shard_bits) = args
+    lo = shard << shard_bits
+    hi = lo + (1 << shard_bits)
+    counts = []
+    for op in range(OPCODES):
+        if SWEEP_CLASSIFY != None:
+            import numpy as np
+            ids = SWEEP_CLASSIFY(np.arange(lo + op, hi, OPCODES, dtype=np.uint32))
+            (values, n) = np.unique(ids, return_counts=True)
+            counts.append(dict(zip(values.tolist(), n.tolist())))
+        else:
+            counts.append(dict(collections.Counter(map(SWEEP_DECODE, range(lo + op, hi, OPCODES)))))
+    return (shard, counts)
+
+def load_checkpoint(path, key, shard_bits):
+    # {shard: counts} from a checkpoint of the same table and shard size
+    try:
+        with open(path) as fh:
+            checkpoint = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    if checkpoint.get("key") != key or checkpoint.get("shard_bits") != shard_bits:
+        return {}
+    return {int(shard): [{int(index): n for (index, n) in counts.items()} for counts in ops]
+        for (shard, ops) in checkpoint["shards"].items()}
+
+def save_checkpoint(path, key, shard_bits, done):
+    ezh_compile.write_atomic(path, json.dumps({"key": key, "shard_bits": shard_bits, "shards": done}).encode())
+
+def sweep(isa, jobs, checkpoint_path, shard_bits=SHARD_BITS, max_shards=None, use_numpy=False):
+    # Returns {shard: counts} for every shard done, now or in an earlier run
+    # with the same checkpoint, sweeping at most max_shards more; raises
+    # ValueError for shard_bits out of range
+    if not MIN_SHARD_BITS <= shard_bits <= 32:
+        raise ValueError("Shard bits must be %d to 32, not %d" % (MIN_SHARD_BITS, shard_bits))
+    # Checkpoints are only valid for the table they were made with
+    key = ezh_compile.table_key(isa.INST)
+    done = load_checkpoint(checkpoint_path, key, shard_bits)
+    shards = 1 << (32 - shard_bits)
+    todo = [shard for shard in range(shards) if shard not in done][:max_shards]
+    print("Sweeping", len(todo), "of", shards, "shards with", jobs, "workers,", len(done), "done before")
+    start = time.perf_counter()
+    with multiprocessing.Pool(jobs, sweep_init, (isa, use_numpy)) as pool:
+        for (i, (shard, counts)) in enumerate(pool.imap_unordered(sweep_shard, [(shard, shard_bits) for shard in todo]), 1):
+            done[shard] = counts
+            save_checkpoint(checkpoint_path, key, shard_bits, done)
+            elapsed = time.perf_counter() - start
+            print("Shard 0x%08X done, %d/%d, %.0f words/sec" % (shard << shard_bits, i, len(todo), (i << shard_bits) / elapsed))
+    return done
+
+def report(isa, done, shard_bits):
+    # The coverage map and ranges as a JSON-able dict
+    inst = isa.INST
+    opcodes = [collections.Counter() for op in range(OPCODES)]
+    for counts in done.values():
+        for (op, c) in enumerate(counts):
+            opcodes[op].update(c)
+    swept = len(done) << shard_bits
+    result = {
+        "words": swept,
+        "complete": swept == 1 << 32,
+        "opcodes": [],
+        "ambiguous": ambiguous_cubes(inst),
+        "undecodable": undecodable_cubes(inst),
+        "mismatches": [],
+    }
+    for (op, c) in enumerate(opcodes):
+        result["opcodes"].append({
+            "opcode": op,
+            "decoded": sum(n for (index, n) in c.items() if index >= 0),
+            "undecodable": c.get(-1, 0),
+            "mnemonics": {inst[index][0]: n for (index, n) in sorted(c.items()) if index >= 0},
+        })
+    if result["complete"]:
+        # The decoder must agree with the table: every entry gets exactly the
+        # words its codemask leaves free, and the rest are undecodable
+        total = collections.Counter()
+        for c in opcodes:
+            total.update(c)
+        for (index, (mnemonic, codemask, _, _)) in enumerate(inst):
+            if total.get(index, 0) != cube_size(codemask):
+                result["mismatches"].append([mnemonic, total.get(index, 0), cube_size(codemask)])
+        expected = sum(cube_size(mask) for (mask, value) in result["undecodable"])
+        if total.get(-1, 0) != expected:
+            result["mismatches"].append(["undecodable", total.get(-1, 0), expected])
+    return result
+
+def main(argv):
+    if len(argv) > 1 and argv[1] in ("-h", "--help"):
+        print("Usage:", argv[0], "[-j jobs] [-s shard_bits] [-m max_shards] [-c checkpoint] [-o report.json] [-I fsl_smartdma_prv.h] [-n]")
+        return
+    jobs = int(argv[argv.index("-j") + 1]) if "-j" in argv else os.cpu_count()
+    shard_bits = int(argv[argv.index("-s") + 1]) if "-s" in argv else SHARD_BITS
+    max_shards = int(argv[argv.index("-m") + 1]) if "-m" in argv else None
+    checkpoint_path = argv[argv.index("-c") + 1] if "-c" in argv else "ezh_sweep.ckpt"
+    if not MIN_SHARD_BITS <= shard_bits <= 32:
+        print("Shard bits (-s) must be %d to 32, not %d" % (MIN_SHARD_BITS, shard_bits))
+        sys.exit(1)
+    isa = ezh_isa
+    try:
+        if "-I" in argv:
+            import ezh_prv
+            isa = ezh_prv.load(argv[argv.index("-I") + 1])
+        ambiguous = ambiguous_cubes(isa.INST)
+        if ambiguous:
+            for (mask, value, mnemonics) in ambiguous:
+                print("Ambiguous: %s for x & 0x%08X == 0x%08X" % (" and ".join(mnemonics), mask, value))
+            sys.exit(1)
+        ezh_common.compiled_isa(isa)
+    except OSError as e:
+        print(e)
+        sys.exit(1)
+    except ezh_compile.IsaError as e:
+        print(e)
+        sys.exit(1)
+    if "-n" in argv and isa is not ezh_isa:
+        print("NumPy backend (-n) only works with the built-in ISA tables")
+        sys.exit(1)
+
+    done = sweep(isa, jobs, checkpoint_path, shard_bits, max_shards, "-n" in argv)
+    result = report(isa, done, shard_bits)
+
+    print()
+    print("%d of %d words swept" % (result["words"], 1 << 32))
+    print("opcode  decoded      undecodable  mnemonics")
+    for op in result["opcodes"]:
+        print("0x%02X    %-12d %-12d %d" % (op["opcode"], op["decoded"], op["undecodable"], len(op["mnemonics"])))
+    print(len(result["ambiguous"]), "ambiguous ranges,", len(result["undecodable"]), "undecodable ranges (mask/value pairs)")
+    for (mnemonic, got, expected) in result["mismatches"]:
+        print("Decoder disagrees with the table:", mnemonic, "has", got, "words, expected", expected)
+    if "-o" in argv:
+        with open(argv[argv.index("-o") + 1], "w") as fh:
+            json.dump(result, fh, indent=1)
+        print("Wrote report", argv[argv.index("-o") + 1])
+    if result["mismatches"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv)
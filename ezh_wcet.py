@@ -0,0 +1,409 @@
+# Static worst-case cycle estimates for EZH images (ezhdis.py -w): for each
+# API entry, function and basic block, the most cycles until the code next
+# waits (HOLD, VECTORED_HOLD, WAIT_FOR_BEAT) or returns
+# Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import os
+import json
+import math
+import hashlib
+import ezh_isa
+import ezh_sim
+import ezh_common
+import ezh_compile
+
+# Instruction costs come from the simulator's cycle model, with conditions
+# taken to pass; cached results are only valid for the model they used, and
+# for the analysis, simulator and decoder sources that produced them
+MODEL = (ezh_sim.BRANCH_CYCLES, ezh_sim.MEMORY_CYCLES, ezh_sim.PERIPH_CYCLES)
+SOURCES = (__file__, ezh_sim.__file__, ezh_isa.__file__)
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__", "ezh_wcet.json")
+
+INF = math.inf
+NONE = -math.inf # no path
+
+# Together with the VECTORED_HOLD family of the table in use (Wcet.waits)
+WAITS = {"E_COND_HOLD", "E_WAIT_FOR_BEAT"}
+
+LINKS = {"E_GOSUB", "E_COND_GOTOL", "E_COND_GOTO_REGL"}
+
+def add(*values):
+    # Sum of path lengths, NONE if any is NONE
+    return NONE if NONE in values else sum(values)
+
+def writes(mnemonic, ops, fields):
+    # Registers an instruction may write
+    regs = set()
+    if len(fields) > 1 and fields[1].kind == "reg":
+        regs.update(ops[i] for i in ezh_isa.written_operands(mnemonic))
+    if mnemonic in LINKS or (ezh_sim.VECTORED.match(mnemonic) and not mnemonic.endswith("_NRA")):
+        regs.add(ezh_sim.RA)
+    return regs
+
+def track(consts, addr, mnemonic, ops, fields):
+    # Updates consts, the registers known to hold constants, for one
+    # instruction at addr: LOAD_SIMM, MOV/MVN and ADD_IMM/SUB_IMM of a
+    # constant or PC set them, anything else writing them forgets them
+    def known(reg):
+        return addr + 4 if reg == ezh_sim.PC else consts.get(reg)
+    value = None
+    if fields and fields[0].kind == "cond" and ops[0] == 0:
+        if mnemonic.startswith("E_COND_LOAD_SIMM"):
+            value = (ops[2] << ops[3]) & ezh_sim.M
+            if "SIMMN" in mnemonic:
+                value = ~value
+        elif mnemonic in ("E_COND_MOV", "E_COND_MVN") and known(ops[2]) != None:
+            value = known(ops[2]) if mnemonic == "E_COND_MOV" else ~known(ops[2])
+        elif mnemonic in ("E_COND_ADD_IMM", "E_COND_SUB_IMM") and known(ops[2]) != None:
+            value = known(ops[2]) + (ops[3] if mnemonic == "E_COND_ADD_IMM" else -ops[3])
+    for reg in writes(mnemonic, ops, fields):
+        consts.pop(reg, None)
+    if value != None and ops[1] not in ezh_sim.SHARED + (ezh_sim.PC, ezh_sim.GPI):
+        consts[ops[1]] = value & ezh_sim.M
+
+def read_bounds(fh):
+    # Loop bound annotations, one "address iterations" per line: address is a
+    # loop header (the target of its backward branch) or a TIGHT_LOOP, and
+    # iterations the most times its body runs each time the loop is entered
+    bounds = {}
+    for line in fh:
+        line = line.split("#")[0].split()
+        if line:
+            bounds[int(line[0], 0)] = int(line[1], 0)
+    return bounds
+
+def load_cache():
+    try:
+        with open(CACHE_PATH) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(cache):
+    # Replaces the cache with the given entries (Wcet.used, so it only holds
+    # those of the last run), unless bytecode writing is off or it can't
+    ezh_compile.write_cache(CACHE_PATH, json.dumps(cache).encode())
+
+def source_key(inst):
+    # Digest of the model, the sources and the ISA table inst in use
+    return ezh_compile.source_key(SOURCES, repr(MODEL).encode(), ezh_compile.table_key(inst).encode())
+
+class Wcet:
+    # Worst cases over the ezh_flow.Flow of an image. Each function is
+    # analyzed once, callees first, and its result cached under a hash of its
+    # words, the bounds given for it and what its callees return, so editing
+    # one function only reanalyzes it and the callers whose inputs changed.
+    # Results: ret and hold are the most cycles from the entry to a return or
+    # a wait (NONE if there is no such path, INF if some loop on the way has
+    # no bound); blocks [start, own cycles, ret, hold] per block; waits
+    # [address, cycles to the next wait or return] per HOLD, VECTORED_HOLD and
+    # WAIT_FOR_BEAT; unbounded and unknown the addresses of loops needing a
+    # bound and of jumps through registers that end paths. used holds the
+    # cache entries this run looked up or added.
+
+    def __init__(self, dis, flow, bounds=None, cache=None):
+        self.dis = dis
+        self.flow = flow
+        self.bounds = bounds or {}
+        self.cache = cache if cache != None else {}
+        self.used = {}
+        self.source_key = source_key(dis.inst)
+        self.waits = WAITS | {m for (m, _, _, _) in dis.inst if ezh_sim.VECTORED.match(m)}
+        self.results = {}
+        self.active = set()
+        self.hits = 0
+        for entry in flow.functions:
+            self.function(entry)
+
+    def function(self, entry):
+        if entry in self.results:
+            return self.results[entry]
+        if entry in self.active or entry not in self.flow.functions:
+            # Recursive, or outside the image
+            return {"ret": INF, "hold": INF, "blocks": [], "waits": [], "unbounded": [], "unknown": [entry]}
+        self.active.add(entry)
+        callees = {callee: self.function(callee) for callee in self.flow.call_graph[entry]}
+        key = self.key(entry, callees)
+        result = self.cache.get(key)
+        if result == None:
+            result = self.cache[key] = self.analyze(entry, callees)
+        else:
+            self.hits += 1
+        self.used[key] = result
+        self.active.discard(entry)
+        self.results[entry] = result
+        return result
+
+    def key(self, entry, callees):
+        h = hashlib.sha1(self.source_key.encode())
+        h.update(repr((entry, sorted((c, r["ret"], r["hold"]) for (c, r) in callees.items()))).encode())
+        for start in self.flow.functions[entry]:
+            block = self.flow.block_at(start)
+            for inst in self.flow.insts[self.flow.index(start):self.flow.index(block.end - 4) + 1]:
+                h.update(b"%d %d %d," % (inst.addr, inst.word, self.bounds.get(inst.addr, -1)))
+        return h.hexdigest()
+
+    def decode(self, inst):
+        # (mnemonic, ops, fields), or None for a word that isn't an instruction
+        index = self.dis.decode(inst.word) if inst.kind == ezh_common.INST else -1
+        if index < 0:
+            return None
+        (mnemonic, _, _, fields) = self.dis.inst[index]
+        return (mnemonic, self.dis.raw[index](inst.word), fields)
+
+    def cost(self, inst, decoded):
+        if decoded == None:
+            return 1
+        try:
+            return ezh_sim.emit_instruction(inst.addr, decoded[0], decoded[1], False).static
+        except ezh_sim.SimError:
+            # An -I table entry the simulator has no semantics for
+            return 1
+
+    def block_info(self, start, unbounded, again):
+        # Per instruction costs of the block, TIGHT_LOOP repeats included;
+        # which instructions wait; how it ends; the constants known at its end
+        flow = self.flow
+        block = flow.block_at(start)
+        insts = flow.insts[flow.index(start):flow.index(block.end - 4) + 1]
+        decoded = [self.decode(inst) for inst in insts]
+        costs = []
+        waits = set()
+        consts = {}
+        for (inst, d) in zip(insts, decoded):
+            cost = self.cost(inst, d)
+            if d != None and d[0] == "E_COND_TIGHT_LOOP":
+                cost += self.tight_loop(inst, d[1], consts, unbounded, again)
+            costs.append(cost)
+            if d != None:
+                if d[0] in self.waits:
+                    waits.add(len(costs) - 1)
+                track(consts, inst.addr, *d)
+        last = decoded[-1]
+        if last != None and last[0] == "E_COND_GOTO_REG" and last[1][1] == ezh_sim.RA:
+            end = "return"
+        elif block.indirect:
+            end = "indirect"
+        elif block.calls:
+            end = "call"
+        elif last != None and last[0] == "E_COND_GOTO" and tuple(last[1]) == (0, start):
+            end = "halt"
+        else:
+            end = "normal"
+        return {"block": block, "insts": insts, "decoded": decoded, "costs": costs, "waits": waits, "end": end, "consts": consts}
+
+    def tight_loop(self, inst, ops, consts, unbounded, again):
+        # Cycles of the extra times round a TIGHT_LOOP body, which runs
+        # rcount + 1 times. If the body waits, that ends any path first, but
+        # a path from the wait can go round again: again then maps the end of
+        # the body to the cycles from its start to the wait.
+        # A body ending outside the image or before it starts has no bound
+        rend = consts.get(ops[1])
+        if rend == None or rend <= inst.addr or self.flow.index(rend) < 0:
+            unbounded.append(inst.addr)
+            return INF
+        cycles = 0
+        for i in range(self.flow.index(inst.addr) + 1, self.flow.index(rend) + 1):
+            d = self.decode(self.flow.insts[i])
+            cycles += self.cost(self.flow.insts[i], d)
+            if d != None and d[0] in self.waits:
+                again[rend] = cycles
+                return 0
+        count = consts.get(ops[2])
+        iterations = self.bounds.get(inst.addr, count + 1 if count != None else None)
+        if iterations == None:
+            unbounded.append(inst.addr)
+            return INF
+        return (iterations - 1) * cycles
+
+    def infer_bound(self, header, body, latches, preds, info):
+        # Trips of a loop counted down to zero: one latch ending
+        # SUB_IMMS(EU, Rn, Rn, k); GOTO(NZ, header), nothing else in the loop
+        # writing Rn, and one way in that sets Rn to a multiple of k
+        if len(latches) != 1 or len(info[latches[0]]["insts"]) < 2:
+            return None
+        decoded = info[latches[0]]["decoded"]
+        (goto, sub) = (decoded[-1], decoded[-2])
+        if goto == None or sub == None or goto[0] != "E_COND_GOTO" or ezh_isa.COND[goto[1][0]] != "NZ":
+            return None
+        if sub[0] != "E_COND_SUB_IMMS" or sub[1][0] != 0 or sub[1][1] != sub[1][2] or sub[1][3] <= 0:
+            return None
+        (reg, k) = (sub[1][1], sub[1][3])
+        for start in body:
+            for d in info[start]["decoded"]:
+                if d != None and d is not sub and reg in writes(*d):
+                    return None
+        outside = [p for p in preds[header] if p not in body]
+        if len(outside) != 1:
+            return None
+        init = info[outside[0]]["consts"].get(reg)
+        if not init or init % k:
+            return None
+        return init // k
+
+    def analyze(self, entry, callees):
+        flow = self.flow
+        starts = flow.functions[entry]
+        inside = set(starts)
+        unbounded = []
+        unknown = []
+        again = {}
+        info = {start: self.block_info(start, unbounded, again) for start in starts}
+
+        def succs(start):
+            return [s for s in info[start]["block"].succs if s in inside]
+
+        # Depth-first from the entry: postorder, so the blocks after each come
+        # before it barring backward branches, and the backward branches
+        order = []
+        back = set()
+        state = {entry: 1}
+        stack = [(entry, iter(succs(entry)))]
+        while stack:
+            (u, it) = stack[-1]
+            for v in it:
+                if state.get(v) == 1:
+                    back.add((u, v))
+                elif v not in state:
+                    state[v] = 1
+                    stack.append((v, iter(succs(v))))
+                    break
+            else:
+                state[u] = 2
+                order.append(u)
+                stack.pop()
+        preds = {start: [] for start in starts}
+        for u in order:
+            for v in succs(u):
+                preds[v].append(u)
+
+        def callee(u):
+            block = info[u]["block"]
+            if not block.calls:
+                return None
+            return callees.get(block.calls[0], {"ret": INF, "hold": INF})
+
+        # Loops, innermost first: the extra trips round each are charged to
+        # its header, if there is a way round that doesn't wait
+        latches = {}
+        for (u, h) in back:
+            latches.setdefault(h, []).append(u)
+        bodies = {}
+        for (h, ls) in latches.items():
+            body = {h}
+            work = list(ls)
+            while work:
+                u = work.pop()
+                if u not in body:
+                    body.add(u)
+                    work.extend(preds[u])
+            bodies[h] = body
+        extra = {}
+        for h in sorted(latches, key=lambda h: len(bodies[h])):
+            body = bodies[h]
+            trip = {}
+            for u in order:
+                if u not in body:
+                    continue
+                if info[u]["waits"]:
+                    trip[u] = NONE
+                    continue
+                through = add(sum(info[u]["costs"]), extra.get(u, 0))
+                if callee(u) != None:
+                    through = add(through, callee(u)["ret"])
+                best = 0 if u in latches[h] else NONE
+                for v in succs(u):
+                    if v in body and (u, v) not in back:
+                        best = max(best, trip.get(v, NONE))
+                trip[u] = add(through, best)
+            if trip[h] == NONE:
+                continue
+            bound = self.bounds.get(h) or self.infer_bound(h, body, latches[h], preds, info)
+            if bound == None:
+                unbounded.append(h)
+                extra[h] = INF
+            else:
+                extra[h] = (bound - 1) * trip[h]
+
+        def value(u, i, values, first):
+            # (ret, hold) from instruction i of block u; backward branches
+            # lead to the first pass values of their targets, if any
+            b = info[u]
+            c = extra.get(u, 0) if i == 0 else 0
+            round_again = NONE
+            for k in range(i, len(b["costs"])):
+                c = add(c, b["costs"][k])
+                if b["insts"][k].addr in again:
+                    round_again = max(round_again, add(c, again[b["insts"][k].addr]))
+                if k in b["waits"]:
+                    return (NONE, max(c, round_again))
+            ret = hold = NONE
+            for v in succs(u):
+                vv = (first or {}).get(v) if (u, v) in back else values.get(v)
+                if vv != None:
+                    ret = max(ret, vv[0])
+                    hold = max(hold, vv[1])
+            end = b["end"]
+            if end == "return":
+                ret = max(ret, 0)
+            elif end == "call":
+                f = callee(u)
+                (ret, hold) = (add(f["ret"], ret), max(f["hold"], add(f["ret"], hold)))
+            elif end in ("indirect", "halt") or not b["block"].succs:
+                hold = max(hold, 0)
+            return (add(c, ret), max(add(c, hold), round_again))
+
+        values = {}
+        for u in order:
+            values[u] = value(u, 0, values, None)
+        # Second pass follows backward branches, for paths from a wait in a
+        # loop round to the next
+        second = {}
+        for u in order:
+            second[u] = value(u, 0, second, values)
+
+        waits = []
+        for u in order:
+            b = info[u]
+            if b["end"] == "indirect" and len(b["insts"]) - 1 not in b["waits"]:
+                unknown.append(b["insts"][-1].addr)
+            for (k, d) in enumerate(b["decoded"]):
+                if d != None and d[0] in self.waits:
+                    (ret, hold) = value(u, k + 1, second, values)
+                    waits.append([b["insts"][k].addr, max(ret, hold)])
+        (ret, hold) = second[entry]
+        return {
+            "ret": ret,
+            "hold": hold,
+            "blocks": [[u, sum(info[u]["costs"]), second[u][0], second[u][1]] for u in sorted(order)],
+            "waits": sorted(waits),
+            "unbounded": sorted(set(unbounded)),
+            "unknown": sorted(set(unknown)),
+        }
+
+    def reach(self, entry, key):
+        # Addresses under key in the results of entry and everything it calls
+        found = set()
+        for start in self.flow.closure([entry]):
+            if start in self.results:
+                found.update(self.results[start][key])
+        return sorted(found)
+
+    def notes(self):
+        # Listing comments: cycles at each block and wait
+        notes = {}
+        for result in self.results.values():
+            for (start, cycles, ret, hold) in result["blocks"]:
+                notes.setdefault(start, ["WCET %s cycles in block, %s to a wait, %s to a return" % (cycles_text(cycles), cycles_text(hold), cycles_text(ret))])
+            for (addr, cycles) in result["waits"]:
+                notes.setdefault(addr, ["WCET %s cycles from here to the next wait or return" % cycles_text(cycles)])
+        return notes
+
+def cycles_text(cycles):
+    if cycles == NONE:
+        return "never"
+    if cycles == INF:
+        return "unbounded"
+    return "%d" % cycles
@@ -0,0 +1,68 @@
+# Cross-reference index for disassembled EZH images (ezhdis.py -X)
+# Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import ezh_isa
+import ezh_common
+
+# How each instruction with an address operand uses it
+REF_KINDS = {
+    "E_COND_PER_READ": "read",
+    "E_COND_PER_WRITE": "write",
+    "E_COND_GOTO": "jump",
+    "E_COND_GOTOL": "call",
+    "E_GOSUB": "call",
+}
+
+PERIPH_ADDRS = {name: address for (address, name) in ezh_isa.PERIPH_REGS.items()}
+
+class Xrefs:
+    # Maps every referenced address (peripheral registers, branch targets, API
+    # entries) to the (address, kind) of each word referencing it, in image
+    # order. Fed one record at a time, so it can be built while disassembling.
+
+    def __init__(self):
+        self.refs = {}
+        self.start = None
+        self.end = None
+
+    def add(self, inst):
+        if self.start == None:
+            self.start = inst.addr
+        self.end = inst.addr + 4
+        if inst.kind == ezh_common.API:
+            self.refs.setdefault(inst.operands[0], []).append((inst.addr, "api"))
+        elif inst.kind == ezh_common.INST and inst.mnemonic in REF_KINDS:
+            kind = REF_KINDS[inst.mnemonic]
+            for v in inst.operands:
+                if type(v) is ezh_isa.Addr:
+                    self.refs.setdefault(int(v), []).append((inst.addr, kind))
+
+    def track(self, insts):
+        # Passes insts through, indexing each record on the way
+        for inst in insts:
+            self.add(inst)
+            yield inst
+
+    def referrers(self, address):
+        # (address, kind) of every word referencing address, which may also be
+        # given as a PERIPH_REGS name
+        if type(address) is str:
+            address = PERIPH_ADDRS.get(address)
+        return self.refs.get(address, [])
+
+    def notes(self):
+        # Listing comments: "Referenced by" at every referenced word of the
+        # image, and a section after the last word for everything outside it
+        notes = {}
+        outside = []
+        for (address, refs) in sorted(self.refs.items()):
+            text = "Referenced by " + ", ".join("0x%08X (%s)" % ref for ref in refs)
+            if self.start != None and self.start <= address < self.end:
+                notes[address] = [text]
+            else:
+                name = ezh_isa.PERIPH_REGS.get(address)
+                outside.append("0x%08X%s: %s" % (address, " " + name if name else "", text))
+        if outside:
+            notes[None] = ["Cross references outside the image"] + outside
+        return notes
@@ -4,113 +4,569 @@
 # Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import os
 import sys
+import copy
+import time
+import functools
+import itertools
+import multiprocessing
 import ezh_isa
+import ezh_compile
+import ezh_csrc
+from ezh_common import WRITE_CHUNK, API, INST, UNKNOWN, PARTIAL, DATA, Instruction
+from ezh_common import compiled_isa, as_words, map_image, listing_line, report
 
-def dis_word(fh, x, addr):
-    sel_mnemonic = None
-    sel_fields = None
-    for (mnemonic, codemask, code, fields) in ezh_isa.INST:
-        if (x ^ code) & codemask == 0:
-            if sel_mnemonic != None:
-                print("prev sel_mnemonic:\t\t", sel_mnemonic)
-                print("new sel_mnemonic:\t\t", mnemonic)
-                print("Duplicate mnemonic match; exiting")
-                sys.exit(1)
-            sel_mnemonic = mnemonic
-            sel_fields = fields
-    width = 0
-    if sel_mnemonic == None:
-        fh.write("E_NOP")
-        width += len("E_NOP")
-        fh.write(" " * (48 - width) + "// " + "Unknown instruction" + "\n")
-        print("Unknown instruction", "0x%08X" % x, "at address", "0x%08X" % addr)
-    else:
-        fh.write(sel_mnemonic)
-        width += len(sel_mnemonic)
-        if sel_fields != []:
-            fh.write("(")
-            width += 1
-            i = 0
-            for field_decoder in sel_fields:
-                if i != 0:
-                    fh.write(", ")
-                    width += 2
-                decoded_str = str(field_decoder(x))
-                fh.write(decoded_str)
-                width += len(decoded_str)
-                i += 1
-            fh.write(")")
-            width += 1
-        fh.write(" " * (48 - width) + "// " + "0x%08X" % addr + "\n")
-
-print(len(ezh_isa.INST), "known instruction mnemonics")
-
-if "-l" in sys.argv:
-    LOAD_ADDR = int(sys.argv[sys.argv.index("-l") + 1], 0)
-else:
-    LOAD_ADDR = 0x00100000
-
-print("Assuming load address", "0x%08X" % LOAD_ADDR)
-
-if "-a" in sys.argv:
-    ENABLE_APITABLE = True
-    NUM_APIS = int(sys.argv[sys.argv.index("-a") + 1])
-    print("Using API table with", NUM_APIS, "entries")
-else:
-    ENABLE_APITABLE = False
-    print("Not using API table")
-
-if "-r" in sys.argv:
-    ezh_isa.ENABLE_PERIPH_REGS = True
-    print("Using named peripheral registers")
-else:
-    ezh_isa.ENABLE_PERIPH_REGS = False
-    print("Not using named peripheral registers")
-
-print()
-
-base_file = sys.argv[-1]
-base_file = base_file if not base_file.endswith(".bin") else base_file.split(".")[0]
-bin_file = base_file + ".bin"
-
-if "-p" in sys.argv:
-    with open(base_file, "r") as fh:
-        res = fh.read()
-    res = res.replace("{", "[")
-    res = res.replace("}", "]")
-    res = res.replace("U", "")
-    res = eval(res)
-    bin_file = base_file + ".bin"
-    with open(bin_file, "wb") as fh:
-        for byte in res:
-            fh.write(byte.to_bytes())
-    print("Wrote binary", bin_file)
-
-disas_file = base_file + ".h"
-
-with open(bin_file, "rb") as fh:
-    with open(disas_file, "w") as dis_out:
-        dis_out.write("// Generated by ezhdis.py from ")
-        dis_out.write(bin_file)
-        dis_out.write("\n\n")
-        dis_out.write('#include "fsl_smartdma_prv.h"\n\n')
-        if ezh_isa.ENABLE_PERIPH_REGS:
+STREAM_CHUNK = 4096
+
+class Disassembler:
+    # Holds no state besides its configuration and decode cache, so one instance
+    # can serve concurrent disassemble() calls
+
+    def __init__(self, load_addr=0x00100000, num_apis=0, periph_regs=False, cache_size=65536, isa=ezh_isa, exact=False):
+        # isa is the ezh_isa module or an ezh_prv.Isa read from a header; with
+        # exact, the listing gives back every word of the image (-e)
+        self.load_addr = load_addr
+        self.num_apis = num_apis
+        self.periph_regs = periph_regs
+        self.exact = exact
+        self.isa = isa
+        self.inst = isa.INST
+        self.ids = {mnemonic: index for (index, (mnemonic, _, _, _)) in enumerate(isa.INST)}
+        (self.decode, self.extract, self.raw) = compiled_isa(isa)
+        self.spare = [ezh_isa.spare_bits(entry) for entry in isa.INST]
+        encode_bits = getattr(isa, "ENCODE_BITS", {})
+        self.encode_bits = [encode_bits.get(mnemonic, 0) for (mnemonic, _, _, _) in isa.INST]
+        self.render = functools.lru_cache(maxsize=cache_size)(self.render_word)
+
+    def render_word(self, x):
+        # Returns (mnemonic, operands, text, spare), or None for an unknown
+        # instruction; spare holds the bits of x that text doesn't encode (those
+        # that differ from what the assembler gives back for them)
+        return self.render_decoded(x, self.decode(x))
+
+    def render_decoded(self, x, index):
+        if index < 0:
+            return None
+        mnemonic = self.inst[index][0]
+        operands = self.extract[index](x)
+        spare = (x ^ self.encode_bits[index]) & self.spare[index]
+        if not operands:
+            return (mnemonic, operands, mnemonic, spare)
+        if self.periph_regs:
+            strs = [ezh_isa.PERIPH_REGS.get(v, v) if type(v) is ezh_isa.Addr else v for v in operands]
+        else:
+            strs = operands
+        return (mnemonic, operands, mnemonic + "(" + ", ".join([str(v) for v in strs]) + ")", spare)
+
+    def placed(self, load_addr, num_apis):
+        # A copy for another load address and API table, sharing the decode cache
+        dis = copy.copy(self)
+        dis.load_addr = load_addr
+        dis.num_apis = num_apis
+        return dis
+
+    def header(self, source_name):
+        text = "// Generated by ezhdis.py from " + source_name + "\n\n"
+        text += '#include "fsl_smartdma_prv.h"\n\n'
+        if self.periph_regs:
             for (address, name) in ezh_isa.PERIPH_REGS.items():
-                dis_out.write("#define " + name + " " + "0x%08X" % address + "\n")
-            dis_out.write("\n")
-        addr = LOAD_ADDR
-        if ENABLE_APITABLE:
-            for i in range(NUM_APIS):
-                word = fh.read(4)
-                addr += 4
-                x = int.from_bytes(word, "little")
-                dis_out.write("DCD " + "0x%08X" % (x & 0x00FFFFFF) + " // API " + str(i) + "\n")
-        word = fh.read(4)
-        while word:
-            x = int.from_bytes(word, "little")
-            dis_word(dis_out, x, addr)
-            word = fh.read(4)
+                text += "#define " + name + " " + "0x%08X" % address + "\n"
+            text += "\n"
+        return text
+
+    def disassemble(self, buffer, load_addr=None):
+        # Returns an iterator of Instruction records for a bytes-like image
+        (words, tail) = as_words(buffer)
+        if len(words) < self.num_apis:
+            raise ValueError("Image has only %d words; too short for API table" % len(words))
+        return self.records(words, tail, self.load_addr if load_addr == None else load_addr)
+
+    def stream(self, fh, load_addr=None):
+        # Like disassemble, but for a binary file-like object read as it arrives
+        return itertools.chain.from_iterable(self.stream_blocks(fh, load_addr))
+
+    def stream_blocks(self, fh, load_addr=None):
+        # Yields a list of Instruction records per read of at most STREAM_CHUNK
+        # bytes, so memory stays flat whatever the input size. read1 returns
+        # whatever is available instead of waiting for a full chunk, so words
+        # are decoded as soon as they arrive. An image too short for the API
+        # table only raises ValueError once its end is reached.
+        read = getattr(fh, "read1", fh.read)
+        addr = self.load_addr if load_addr == None else load_addr
+        index = 0
+        pending = b""
+        while True:
+            data = read(STREAM_CHUNK)
+            if not data:
+                break
+            (words, pending) = as_words(pending + data if pending else data)
+            if len(words):
+                yield list(self.records(words, b"", addr, index))
+                addr += 4 * len(words)
+                index += len(words)
+        if index < self.num_apis:
+            raise ValueError("Image has only %d words; too short for API table" % index)
+        if pending:
+            yield list(self.records((), pending, addr, index))
+
+    def records(self, words, tail, addr, index=0):
+        # words[0] is word number index of the image, the first num_apis of
+        # which make up the API table
+        apis = max(0, min(len(words), self.num_apis - index))
+        for i in range(apis):
+            target = words[i] & 0x00FFFFFF
+            yield Instruction(addr, words[i], API, "DCD", (target,), "DCD 0x%08X" % (words[i] if self.exact else target), "API %d" % (index + i))
+            addr += 4
+        render = self.render
+        exact = self.exact
+        for x in words[apis:]:
+            rendered = render(x)
+            if rendered == None:
+                yield Instruction(addr, x, UNKNOWN, None, (), "DCD 0x%08X" % x if exact else "E_NOP", "Unknown instruction")
+            elif rendered[3] and exact:
+                comment = "0x%08X %s with spare bits 0x%08X" % (addr, rendered[2], rendered[3])
+                yield Instruction(addr, x, INST, rendered[0], rendered[1], "DCD 0x%08X" % x, comment)
+            else:
+                yield Instruction(addr, x, INST, rendered[0], rendered[1], rendered[2], "0x%08X" % addr)
             addr += 4
+        if tail:
+            text = "DCB " + ", ".join("0x%02X" % byte for byte in tail)
+            yield Instruction(addr, int.from_bytes(tail, "little"), PARTIAL, "DCB", tuple(tail), text, "Partial word at " + "0x%08X" % addr)
+
+class Listing:
+    # Output format: C macro listing for fsl_smartdma_prv.h. The formats in
+    # ezh_export have the same interface: constructed on an open file of the
+    # given mode, write() called for each run of records, then close(). notes
+    # maps addresses to comments (such as ezh_flow labels) for the word there,
+    # and None to comments after the last word.
+
+    extension = ".h"
+    mode = "w"
+
+    def __init__(self, dis, source_name, out, notes=None):
+        self.out = out
+        self.notes = notes
+        out.write(dis.header(source_name))
+
+    def write(self, insts, verbose=True):
+        # Returns (number of words, number of unknown instructions)
+        lines = []
+        count = 0
+        unknown = 0
+        for inst in insts:
+            count += 1
+            unknown += report(inst, verbose)
+            if self.notes and inst.addr in self.notes:
+                lines.append("\n" + "".join("// " + note + "\n" for note in self.notes[inst.addr]))
+            lines.append(listing_line(inst))
+            if len(lines) >= WRITE_CHUNK:
+                self.out.write("".join(lines))
+                lines.clear()
+        self.out.write("".join(lines))
+        return (count, unknown)
+
+    def close(self):
+        if self.notes and None in self.notes:
+            self.out.write("\n" + "".join("// " + note + "\n" for note in self.notes[None]))
+
+def output_format(name):
+    # Output class for a -f argument; raises KeyError for an unknown one
+    if name == "h":
+        return Listing
+    import ezh_export
+    return ezh_export.FORMATS[name]
+
+def write_output(fmt, dis, insts, source_name, out, verbose=True, notes=None):
+    output = fmt(dis, source_name, out, notes)
+    result = output.write(insts, verbose)
+    output.close()
+    return result
+
+def write_listing(dis, insts, source_name, dis_out, verbose=True):
+    return write_output(Listing, dis, insts, source_name, dis_out, verbose)
+
+def stream_output(fmt, dis, fh, source_name, out, verbose=True):
+    # Like write_output for dis.stream(fh), but flushes out after every read
+    # so each record is out as soon as its word has arrived
+    output = fmt(dis, source_name, out, None)
+    out.flush()
+    count = 0
+    unknown = 0
+    for block in dis.stream_blocks(fh):
+        (block_count, block_unknown) = output.write(block, verbose)
+        out.flush()
+        count += block_count
+        unknown += block_unknown
+    output.close()
+    return (count, unknown)
+
+def batch_inputs(paths):
+    # Expand directories to the .bin images below them
+    for path in paths:
+        if os.path.isdir(path):
+            for (root, dirs, files) in sorted(os.walk(path)):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(".bin"):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+def infer_placement(dis, buffer, fixed):
+    # Returns (dis placed where ezh_infer puts buffer, the ezh_infer.Guess);
+    # fixed is (load address, API table size), either None to infer it
+    import ezh_infer
+    (load_addr, num_apis) = fixed
+    guess = ezh_infer.infer(dis, buffer, load_addr)
+    return (dis.placed(guess.load_addr, guess.num_apis if num_apis == None else num_apis), guess)
+
+def batch_init(options, format_name, infer=None):
+    # Runs once per worker process
+    global BATCH_DIS, BATCH_FORMAT, BATCH_INFER
+    BATCH_DIS = Disassembler(**options)
+    BATCH_FORMAT = output_format(format_name)
+    BATCH_INFER = infer
+
+def batch_file(bin_file):
+    # Returns (bin_file, words, unknown, error, placement)
+    try:
+        with open(bin_file, "rb") as fh:
+            buffer = map_image(fh)
+        dis = BATCH_DIS
+        placement = None
+        if BATCH_INFER != None:
+            import ezh_infer
+            (dis, guess) = infer_placement(dis, buffer, BATCH_INFER)
+            placement = ezh_infer.summary(guess)
+        insts = dis.disassemble(buffer)
+        with open(os.path.splitext(bin_file)[0] + BATCH_FORMAT.extension, BATCH_FORMAT.mode) as out:
+            (count, unknown) = write_output(BATCH_FORMAT, dis, insts, os.path.basename(bin_file), out, verbose=False)
+        return (bin_file, count, unknown, None, placement)
+    except (OSError, ValueError) as e:
+        return (bin_file, 0, 0, str(e), None)
+
+def batch(paths, options, jobs, format_name="h", infer=None):
+    bin_files = list(batch_inputs(paths))
+    print("Disassembling", len(bin_files), "images with", jobs, "workers")
+    start = time.perf_counter()
+    total_words = 0
+    failed = 0
+    extension = output_format(format_name).extension
+    with multiprocessing.Pool(jobs, batch_init, (options, format_name, infer)) as pool:
+        for (bin_file, count, unknown, error, placement) in pool.imap_unordered(batch_file, bin_files):
+            if error != None:
+                failed += 1
+                print("Failed", bin_file + ":", error)
+            else:
+                total_words += count
+                print("Wrote disassembly", os.path.splitext(bin_file)[0] + extension, "(%d words, %d unknown%s)" % (
+                    count, unknown, "; " + placement if placement else ""))
+    elapsed = time.perf_counter() - start
+    print()
+    print("%d images, %d failed, %d words in %.2f s" % (len(bin_files), failed, total_words, elapsed))
+    print("%.0f words/sec, %.1f files/sec" % (total_words / elapsed, len(bin_files) / elapsed))
+    return failed
+
+def extract(dis, c_file, in_memory, fmt=Listing, infer=None):
+    # Disassembles every firmware array in a C source to <array name>.h (or
+    # the extension of fmt) next to it; see infer_placement for infer
+    out_dir = os.path.dirname(c_file)
+    failed = 0
+    with open(c_file, "r", encoding="latin-1") as fh:
+        for (name, image, error) in ezh_csrc.arrays(fh):
+            if error != None:
+                failed += 1
+                print("Skipped array", name + ":", error)
+                continue
+            array_dis = dis
+            if infer != None:
+                import ezh_infer
+                (array_dis, guess) = infer_placement(dis, image, infer)
+                print("Array", name + ":", ezh_infer.summary(guess))
+            try:
+                insts = array_dis.disassemble(image)
+            except ValueError as e:
+                failed += 1
+                print("Skipped array", name + ":", e)
+                continue
+            base_file = os.path.join(out_dir, name)
+            bin_file = base_file + ".bin"
+            if in_memory:
+                bin_file = name
+            else:
+                with open(bin_file, "wb") as fh_bin:
+                    fh_bin.write(image)
+                print("Wrote binary", bin_file)
+            with open(base_file + fmt.extension, fmt.mode) as out:
+                write_output(fmt, array_dis, insts, os.path.basename(bin_file), out)
+            print("Wrote disassembly", base_file + fmt.extension)
+    return failed
+
+def positional_args(argv):
+    args = []
+    i = 1
+    while i < len(argv):
+        if argv[i] in ("-l", "-a", "-c", "-j", "-f", "-L", "-I"):
+            i += 2
+        else:
+            if not argv[i].startswith("-"):
+                args.append(argv[i])
+            i += 1
+    return args
+
+def main(argv):
+    listing_out = sys.stdout
+    streaming = "-s" in argv or argv[-1] == "-"
+    if streaming:
+        # The listing has stdout to itself
+        sys.stdout = sys.stderr
+
+    isa = ezh_isa
+    try:
+        if "-I" in argv:
+            import ezh_prv
+            isa = ezh_prv.load(argv[argv.index("-I") + 1])
+            print("Using ISA tables from", argv[argv.index("-I") + 1])
+        compiled_isa(isa)
+    except OSError as e:
+        print(e)
+        sys.exit(1)
+    except ezh_compile.IsaError as e:
+        print(e)
+        sys.exit(1)
+
+    print(len(isa.INST), "known instruction mnemonics")
+
+    if "-l" in argv:
+        load_addr = int(argv[argv.index("-l") + 1], 0)
+    else:
+        load_addr = 0x00100000
+
+    if "-a" in argv:
+        num_apis = int(argv[argv.index("-a") + 1])
+    else:
+        num_apis = 0
+
+    # With -i, whichever of -l and -a isn't given is inferred per image
+    infer = None
+    if "-i" in argv:
+        infer = (load_addr if "-l" in argv else None, num_apis if "-a" in argv else None)
+        if streaming:
+            print("Inference (-i) needs the whole image; give -l and -a when streaming")
+            sys.exit(1)
+
+    # The flow, timing, data and NumPy passes only run on one whole image
+    passes = [flag for flag in ("-g", "-X", "-w", "-d", "-n") if flag in argv]
+    modes = [name for (name, used) in (("-b", "-b" in argv), ("-x", "-x" in argv), ("streaming", streaming)) if used]
+    if passes and modes:
+        print(" ".join(passes), "can't be combined with", modes[0])
+        sys.exit(1)
+
+    if infer != None and infer[0] == None:
+        print("Inferring load address")
+    else:
+        print("Assuming load address", "0x%08X" % load_addr)
+
+    if infer != None and infer[1] == None:
+        print("Inferring API table size")
+    elif "-a" in argv:
+        print("Using API table with", num_apis, "entries")
+    else:
+        print("Not using API table")
+
+    if "-r" in argv:
+        periph_regs = True
+        print("Using named peripheral registers")
+    else:
+        periph_regs = False
+        print("Not using named peripheral registers")
+
+    if "-e" in argv:
+        exact = True
+        print("Listing every word exactly")
+    else:
+        exact = False
+
+    if "-c" in argv:
+        cache_size = int(argv[argv.index("-c") + 1])
+    else:
+        cache_size = 65536
+
+    print("Decode cache holds", cache_size, "words")
+
+    format_name = argv[argv.index("-f") + 1] if "-f" in argv else "h"
+    try:
+        fmt = output_format(format_name)
+    except KeyError:
+        print("Unknown output format", format_name)
+        sys.exit(1)
+
+    print()
+
+    if "-b" in argv:
+        if "-j" in argv:
+            jobs = int(argv[argv.index("-j") + 1])
+        else:
+            jobs = os.cpu_count()
+        if jobs < 1:
+            print("Need at least one worker, not", jobs)
+            sys.exit(1)
+        options = {"load_addr": load_addr, "num_apis": num_apis, "periph_regs": periph_regs, "cache_size": cache_size, "isa": isa, "exact": exact}
+        if batch(positional_args(argv), options, jobs, format_name, infer):
+            sys.exit(1)
+        return
+
+    dis = Disassembler(load_addr, num_apis, periph_regs, cache_size, isa, exact)
+
+    if "-x" in argv:
+        try:
+            failed = extract(dis, argv[-1], "-m" in argv, fmt, infer)
+        except ValueError as e:
+            print(argv[-1] + ":", e)
+            sys.exit(1)
+        if failed:
+            sys.exit(1)
+        return
+
+    if streaming:
+        source_name = "stdin" if argv[-1] == "-" else argv[-1]
+        try:
+            out = listing_out if fmt.mode == "w" else listing_out.buffer
+            if argv[-1] == "-":
+                stream_output(fmt, dis, sys.stdin.buffer, source_name, out)
+            else:
+                with open(argv[-1], "rb") as fh:
+                    stream_output(fmt, dis, fh, source_name, out)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        except BrokenPipeError:
+            # Reader went away, e.g. piped into head
+            os.dup2(os.open(os.devnull, os.O_WRONLY), listing_out.fileno())
+            sys.exit(1)
+        cache_info = dis.render.cache_info()
+        print("Decode cache:", cache_info.hits, "hits,", cache_info.misses, "misses")
+        return
+
+    base_file = argv[-1]
+    base_file = base_file if not base_file.endswith(".bin") else base_file[:-len(".bin")]
+    bin_file = base_file + ".bin"
+
+    disas_file = base_file + fmt.extension
+
+    if "-p" in argv:
+        try:
+            with open(base_file, "r") as fh:
+                buffer = ezh_csrc.read_array(fh)
+        except ValueError as e:
+            print(base_file + ":", e)
+            sys.exit(1)
+        if "-m" in argv:
+            bin_file = base_file
+        else:
+            with open(bin_file, "wb") as fh:
+                fh.write(buffer)
+            print("Wrote binary", bin_file)
+    else:
+        with open(bin_file, "rb") as fh:
+            buffer = map_image(fh)
+
+    if infer != None:
+        import ezh_infer
+        (dis, guess) = infer_placement(dis, buffer, infer)
+        for line in ezh_infer.report(guess):
+            print(line)
+
+    try:
+        if "-n" in argv:
+            if isa is not ezh_isa:
+                print("NumPy backend (-n) only works with the built-in ISA tables")
+                sys.exit(1)
+            import ezh_numpy
+            insts = ezh_numpy.disassemble(dis, buffer)
+        else:
+            insts = dis.disassemble(buffer)
+    except ImportError:
+        print("NumPy backend (-n) needs numpy installed")
+        sys.exit(1)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    notes = None
+    if "-X" in argv:
+        import ezh_xref
+        xrefs = ezh_xref.Xrefs()
+        insts = list(xrefs.track(insts))
+        notes = xrefs.notes()
+        print("Cross references to", len(xrefs.refs), "addresses")
+
+    if "-g" in argv or "-w" in argv or "-d" in argv:
+        import ezh_flow
+        insts = list(insts)
+        flow = ezh_flow.Flow(insts)
+
+    if "-g" in argv:
+        flow_notes = flow.notes()
+        for (address, lines) in (notes or {}).items():
+            flow_notes.setdefault(address, []).extend(lines)
+        notes = flow_notes
+        print("Recovered", len(flow.blocks), "basic blocks in", len(flow.functions), "functions,",
+            sum(block.indirect for block in flow.blocks), "ending in indirect jumps")
+        for (target, i) in flow.apis:
+            regions = flow.regions(target)
+            print("API %d at 0x%08X reaches %d words in %d regions" % (i, target, sum(end - start for (start, end) in regions) // 4, len(regions)))
+        print(sum(flow.reached), "of", len(insts), "words reached")
+
+    if "-w" in argv:
+        import ezh_wcet
+        bounds = {}
+        if "-L" in argv:
+            try:
+                with open(argv[argv.index("-L") + 1]) as fh:
+                    bounds = ezh_wcet.read_bounds(fh)
+            except (OSError, ValueError, IndexError) as e:
+                print("Loop bounds:", e)
+                sys.exit(1)
+        cache = ezh_wcet.load_cache()
+        wcet = ezh_wcet.Wcet(dis, flow, bounds, cache)
+        ezh_wcet.save_cache(wcet.used)
+        wcet_notes = wcet.notes()
+        for (address, lines) in (notes or {}).items():
+            wcet_notes.setdefault(address, []).extend(lines)
+        notes = wcet_notes
+        print("Worst-case cycles for", len(wcet.results), "functions,", wcet.hits, "cached")
+        for (target, i) in flow.apis:
+            result = wcet.function(target)
+            print("API %d at 0x%08X: %s cycles to a wait, %s to a return" % (i, target,
+                ezh_wcet.cycles_text(result["hold"]), ezh_wcet.cycles_text(result["ret"])))
+            unbounded = wcet.reach(target, "unbounded")
+            if unbounded:
+                print("  needs loop bounds (-L) at", ", ".join("0x%08X" % a for a in unbounded))
+            unknown = wcet.reach(target, "unknown")
+            if unknown:
+                print("  paths end at jumps through registers at", ", ".join("0x%08X" % a for a in unknown))
+
+    if "-d" in argv:
+        # Words outside reached code and the literals PC-relative loads read
+        # are listed as DCDs; the flow and timing passes keep the decoded ones
+        insts = flow.data_records()
+        print(sum(inst.kind == DATA for inst in insts), "words listed as data")
+        indirect = sum(block.indirect for block in flow.blocks)
+        if indirect:
+            print("Code reached only through indirect jumps (%d) is listed as data too" % indirect)
+
+    try:
+        with open(disas_file, fmt.mode) as out:
+            write_output(fmt, dis, insts, bin_file, out, notes=notes)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    cache_info = dis.render.cache_info()
+    print("Decode cache:", cache_info.hits, "hits,", cache_info.misses, "misses")
+    print("Wrote disassembly", disas_file)
 
-print("Wrote disassembly", disas_file)
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,47 @@
+# ISA tables derived from fsl_smartdma_prv.h against the hand-written ones
+# (python3 -m pytest tests)
+# Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import io
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ezh_prv
+import ezhdis
+
+SPECIMENS = os.path.join(ROOT, "specimens")
+HEADER = os.path.join(SPECIMENS, "fsl_smartdma_prv.h")
+
+PLACEMENT = {
+    "fsl_smartdma.2.14.0.bin": (0x00100000, 21),
+    "camera_engine.bin": (0x0001001C, 0),
+}
+
+def listing(dis, name):
+    with open(os.path.join(SPECIMENS, name), "rb") as fh:
+        buffer = fh.read()
+    out = io.StringIO()
+    ezhdis.write_listing(dis, dis.disassemble(buffer), name, out, verbose=False)
+    return out.getvalue()
+
+class HeaderTablesTest(unittest.TestCase):
+
+    def test_listings_match_default_tables(self):
+        isa = ezh_prv.load(HEADER)
+        for (name, (load_addr, num_apis)) in PLACEMENT.items():
+            for periph_regs in (False, True):
+                default = ezhdis.Disassembler(load_addr, num_apis, periph_regs)
+                derived = ezhdis.Disassembler(load_addr, num_apis, periph_regs, isa=isa)
+                self.assertEqual(listing(derived, name), listing(default, name), name)
+
+    def test_no_code_differences(self):
+        isa = ezh_prv.load(HEADER)
+        self.assertEqual([line for line in ezh_prv.compare(isa) if not line.endswith("only in header")], [])
+
+if __name__ == "__main__":
+    unittest.main()
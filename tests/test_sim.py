@@ -0,0 +1,87 @@
+# Behaviour tests for the simulator (python3 -m pytest tests)
+# Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ezh_asm
+import ezh_sim
+
+# Counts rising edges on GPI in R1, polling with 11-cycle trips while the
+# pins are low and again while they are high
+POLL = [
+    "E_COND_MOVS(EU, R2, GPI)",
+    *["E_NOP"] * 8,
+    "E_COND_GOTO(ZE, 0x00100000)",
+    "E_COND_ADD_IMM(EU, R1, R1, 1)",
+    "E_COND_MOVS(EU, R2, GPI)",
+    *["E_NOP"] * 8,
+    "E_COND_GOTO(NZ, 0x0010002C)",
+    "E_COND_GOTO(EU, 0x00100000)",
+]
+
+# Edges that fall inside a trip, and a pulse shorter than one
+EDGES = [(1000, 1), (5000, 0), (7003, 1), (7010, 0)]
+
+# A 1000-trip TIGHT_LOOP around two instructions that change nothing
+DELAY = [
+    "E_COND_LOAD_SIMM(EU, R0, 1, 20)",
+    "E_COND_ADD_IMM(EU, R0, R0, 0x14)",
+    "E_COND_LOAD_SIMM(EU, R1, 999, 0)",
+    "E_COND_TIGHT_LOOP(EU, R0, R1)",
+    "E_NOP",
+    "E_NOP",
+    "E_COND_ADD_IMM(EU, R2, R2, 1)",
+    "E_COND_GOTO(EU, 0x0010001C)",
+]
+
+# Adds 1 to R1, then overwrites that instruction with the one at the end
+# (which adds 16) and runs it again
+PATCH = [
+    "E_COND_ADD_IMM(EU, R1, R1, 1)",
+    "E_COND_LDR(EU, R2, PC, 5)",
+    "E_COND_STR(EU, PC, R2, -3)",
+    "E_COND_ADD_IMM(EU, R3, R3, 1)",
+    "E_COND_SUB_IMMS(EU, R4, R3, 2)",
+    "E_COND_GOTO(NZ, 0x00100000)",
+    "E_COND_GOTO(EU, 0x00100018)",
+    "E_COND_ADD_IMM(EU, R1, R1, 16)",
+]
+
+def state(sim):
+    return (sim.r, sim.cycle, sim.count, sorted(sim.cycles_at().items()))
+
+class SkipTest(unittest.TestCase):
+
+    def test_polling_loop_sees_every_edge(self):
+        image = ezh_asm.assemble(POLL)
+        fast = ezh_sim.Sim(image, env=ezh_sim.Stimulus(EDGES))
+        self.assertEqual(fast.run(20000), "idle")
+        self.assertEqual(fast.r[1], 2)
+        slow = ezh_sim.Sim(image, env=ezh_sim.Stimulus(EDGES), fast_forward=False)
+        self.assertEqual(slow.run(fast.cycle), "cycle limit")
+        self.assertEqual(state(fast), state(slow))
+
+    def test_tight_loop_counts(self):
+        image = ezh_asm.assemble(DELAY)
+        fast = ezh_sim.Sim(image)
+        self.assertEqual(fast.run(10000), "halt")
+        slow = ezh_sim.Sim(image, fast_forward=False)
+        slow.run(fast.cycle)
+        self.assertEqual(fast.r[2], 1)
+        self.assertEqual(state(fast), state(slow))
+
+class TranslationTest(unittest.TestCase):
+
+    def test_store_into_code_drops_its_block(self):
+        sim = ezh_sim.Sim(ezh_asm.assemble(PATCH))
+        self.assertEqual(sim.run(1000), "halt")
+        self.assertEqual(sim.r[1], 17)
+        self.assertTrue(any(block.start == 0x00100000 for block in sim.retired))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+# Worst-case cycle estimates on small images (python3 -m pytest tests)
+# Copyright (c) 2023 Aedan Cullen <aedan@aedancullen.com>
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ezh_asm
+import ezh_flow
+import ezh_wcet
+import ezhdis
+
+def estimate(lines):
+    dis = ezhdis.Disassembler()
+    flow = ezh_flow.Flow(list(dis.disassemble(ezh_asm.assemble(lines))))
+    return ezh_wcet.Wcet(dis, flow, cache={})
+
+class TightLoopTest(unittest.TestCase):
+
+    def test_body_ending_outside_image(self):
+        wcet = estimate([
+            "E_COND_LOAD_SIMM(EU, R0, 255, 24)",
+            "E_COND_TIGHT_LOOP(EU, R0, R1)",
+            "E_NOP",
+            "E_NOP",
+            "E_COND_GOTO(EU, 0x00100010)",
+        ])
+        self.assertIn(0x00100004, wcet.function(0x00100000)["unbounded"])
+
+    def test_body_ending_before_loop(self):
+        wcet = estimate([
+            "E_COND_LOAD_SIMM(EU, R0, 1, 20)",
+            "E_COND_LOAD_SIMM(EU, R1, 3, 0)",
+            "E_COND_TIGHT_LOOP(EU, R0, R1)",
+            "E_NOP",
+            "E_COND_GOTO(EU, 0x00100010)",
+        ])
+        self.assertIn(0x00100008, wcet.function(0x00100000)["unbounded"])
+
+    def test_bounded_body(self):
+        # Four times round two NOPs; only the halt after it is unbounded
+        wcet = estimate([
+            "E_COND_LOAD_SIMM(EU, R0, 1, 20)",
+            "E_COND_ADD_IMM(EU, R0, R0, 0x14)",
+            "E_COND_LOAD_SIMM(EU, R1, 3, 0)",
+            "E_COND_TIGHT_LOOP(EU, R0, R1)",
+            "E_NOP",
+            "E_NOP",
+            "E_COND_GOTO(EU, 0x00100018)",
+        ])
+        self.assertNotIn(0x0010000C, wcet.function(0x00100000)["unbounded"])
+
+if __name__ == "__main__":
+    unittest.main()